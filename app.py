@@ -1,13 +1,22 @@
 import streamlit as st
+import st_compat  # noqa: F401 - applies shims for older Streamlit releases
 import os
+import atexit
+import copy
+import hashlib
 import tempfile
 import json
 from pathlib import Path
-import time
+import threading
+import queue
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from audio_processor import AudioProcessor
 from video_generator import VideoGenerator
 from mp3_embedder import MP3Embedder
-from utils import format_timestamp, validate_audio_file, get_audio_info
+from typing import List, Dict
+from utils import format_timestamp, validate_audio_file, get_audio_info, WordTimings
 
 # Page configuration
 st.set_page_config(
@@ -16,17 +25,13 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize session state
-if 'step' not in st.session_state:
-    st.session_state.step = 1
-if 'audio_file' not in st.session_state:
-    st.session_state.audio_file = None
-if 'transcription_data' not in st.session_state:
-    st.session_state.transcription_data = None
-if 'edited_text' not in st.session_state:
-    st.session_state.edited_text = ""
-if 'video_style' not in st.session_state:
-    st.session_state.video_style = {
+# Initial session state; deep-copied so sessions never share the style dict
+_SESSION_DEFAULTS = {
+    'step': 1,
+    'audio_file': None,
+    'transcription_data': None,
+    'edited_text': "",
+    'video_style': {
         'animation_style': 'Karaoke Style',
         'text_color': '#FFFFFF',
         'highlight_color': '#FFD700',
@@ -34,41 +39,51 @@ if 'video_style' not in st.session_state:
         'font_family': 'Arial',
         'font_size': 48
     }
+}
 
-if not hasattr(st, "divider"):
-    def _divider():
-        st.markdown("---")
-    st.divider = _divider
+def init_session_state():
+    """Populate session state with the defaults"""
+    st.session_state.update(copy.deepcopy(_SESSION_DEFAULTS))
+    st.session_state._init = True
 
-# Patch st.button for Streamlit versions that don't support the 'type' argument (<=1.12)
-import inspect as _st_inspect
-if "type" not in _st_inspect.signature(st.button).parameters:
-    _orig_button = st.button
+# Initialize session state once per session
+if '_init' not in st.session_state:
+    init_session_state()
 
-    def _patched_button(label, *args, **kwargs):
-        # Remove kwargs not supported in this Streamlit version
-        kwargs.pop("type", None)
-        kwargs.pop("use_container_width", None)
-        return _orig_button(label, *args, **kwargs)
+# Shared, process-wide processing resources. Streamlit reruns the whole script
+# on every interaction, so these are created once instead of per button press.
+@st.cache_resource
+def get_audio_processor():
+    """Get the shared audio processor"""
+    return AudioProcessor()
 
-    st.button = _patched_button
+@st.cache_resource
+def get_work_dir():
+    """Get the process-wide directory export files are written to"""
+    return tempfile.TemporaryDirectory(prefix="syncmaster_")
 
-# Provide st.rerun alias for older Streamlit versions
-if not hasattr(st, "rerun") and hasattr(st, "experimental_rerun"):
-    st.rerun = st.experimental_rerun
+@st.cache_resource
+def get_mp3_embedder():
+    """Get the shared MP3 embedder"""
+    return MP3Embedder(work_dir=get_work_dir().name)
 
-# Patch st.download_button for unsupported kwargs in older Streamlit versions
-if hasattr(st, "download_button"):
-    import inspect as _dl_inspect
-    _dl_sig = _dl_inspect.signature(st.download_button)
-    if "use_container_width" not in _dl_sig.parameters:
-        _orig_download_button = st.download_button
+@st.cache_resource
+def get_video_generator():
+    """Get the shared video generator"""
+    return VideoGenerator()
 
-        def _patched_download_button(label, data, *args, **kwargs):
-            kwargs.pop("use_container_width", None)
-            return _orig_download_button(label, data, *args, **kwargs)
+# Transcription waits on the Gemini API, so concurrent sessions each get a
+# worker instead of queueing behind each other
+TRANSCRIPTION_WORKERS = 8
 
-        st.download_button = _patched_download_button
+@st.cache_resource
+def get_transcription_executor():
+    """Get the shared executor that runs transcription jobs off the script thread"""
+    return ThreadPoolExecutor(max_workers=TRANSCRIPTION_WORKERS, thread_name_prefix="transcribe")
+
+# Build the audio processor while the page first loads, so the first click on
+# "Process Audio" does not also pay for client setup; later reruns hit the cache
+get_audio_processor()
 
 def main():
     # Header
@@ -121,6 +136,12 @@ def step_1_upload_and_process():
     if uploaded_file is not None:
         st.session_state.audio_file = uploaded_file
         
+        # A job started for a previous upload must not attach its result to this one
+        job = st.session_state.get('transcription_job')
+        if job is not None and job['upload_id'] != uploaded_file.file_id:
+            job['future'].cancel()
+            st.session_state.transcription_job = None
+        
         # Display file info
         st.success(f"File uploaded: {uploaded_file.name}")
         st.info(f"File size: {uploaded_file.size / 1024 / 1024:.2f} MB")
@@ -128,8 +149,10 @@ def step_1_upload_and_process():
         # Audio preview
         st.audio(uploaded_file)
         
-        # Process button
-        if st.button("🚀 Start AI Processing", type="primary", use_container_width=True):
+        # Process button, or progress of a job started on an earlier run
+        if st.session_state.get('transcription_job') is not None:
+            wait_for_transcription()
+        elif st.button("🚀 Start AI Processing", type="primary", use_container_width=True):
             process_audio()
     
     # Reset button
@@ -141,74 +164,151 @@ def step_1_upload_and_process():
 def process_audio():
     """Process the uploaded audio file with AI transcription"""
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(st.session_state.audio_file.name).suffix) as tmp_file:
-            tmp_file.write(st.session_state.audio_file.getvalue())
-            tmp_file_path = tmp_file.name
+        # Write the upload to this session's temp file in 1 MiB slices of the
+        # upload's own buffer, so no copy of the payload is made, and hash it
+        # on the way to key the transcription cache
+        suffix = Path(st.session_state.audio_file.name).suffix
+        tmp_file_path = get_session_audio_path(suffix)
+        hasher = hashlib.sha256()
+        chunk_size = 1024 * 1024
+        with st.session_state.audio_file.getbuffer() as view, \
+                open(tmp_file_path, 'wb') as tmp_file:
+            for offset in range(0, len(view), chunk_size):
+                chunk = view[offset:offset + chunk_size]
+                hasher.update(chunk)
+                tmp_file.write(chunk)
+        audio_digest = hasher.hexdigest()
         
         # Validate audio file
         if not validate_audio_file(tmp_file_path):
             st.error("Invalid audio file format. Please upload a valid MP3, WAV, or M4A file.")
-            os.unlink(tmp_file_path)
             return
         
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        # Initialize audio processor
-        processor = AudioProcessor()
+        # Run the transcription in the background so the script thread stays
+        # free to render progress; the job survives reruns in session state
+        progress_queue = queue.Queue()
+        future = get_transcription_executor().submit(
+            _run_transcription, get_script_run_ctx(), audio_digest, suffix,
+            tmp_file_path, progress_queue
+        )
+        st.session_state.transcription_job = {
+            'future': future,
+            'progress_queue': progress_queue,
+            'progress': 0.0,
+            'audio_digest': audio_digest,
+            'audio_path': tmp_file_path,
+            'upload_id': st.session_state.audio_file.file_id
+        }
         
-        # Step 1: Transcription
+    except Exception as e:
+        st.error(f"Error processing audio: {str(e)}")
+        return
+    
+    wait_for_transcription()
+
+class _UncachedTranscription(Exception):
+    """Carries a fallback transcription out of the cached helper so it is not stored"""
+    
+    def __init__(self, result):
+        super().__init__("transcription unavailable")
+        self.result = result
+
+@st.cache_data(persist="disk", show_spinner=False, max_entries=64)
+def _transcribe_cached(audio_digest: str, suffix: str, _audio_path: str, _progress_queue: queue.Queue):
+    """Transcribe audio once per file content; repeat uploads are served from the cache"""
+    transcription_result, word_timestamps = get_audio_processor().transcribe_and_align(
+        _audio_path, progress_q=_progress_queue
+    )
+    result = (transcription_result, WordTimings.from_dicts(word_timestamps))
+    
+    # Placeholder text and empty timings are transient failures, never cache them
+    if AudioProcessor.is_fallback_text(transcription_result) or not word_timestamps:
+        raise _UncachedTranscription(result)
+    return result
+
+def _run_transcription(ctx, audio_digest: str, suffix: str, audio_path: str, progress_queue: queue.Queue):
+    """Transcribe audio and extract word timestamps (runs on the executor thread)"""
+    # st.cache_data only reads and writes entries on a thread that carries
+    # the session's script context; without it every call is a miss
+    add_script_run_ctx(threading.current_thread(), ctx)
+    try:
+        return _transcribe_cached(audio_digest, suffix, audio_path, progress_queue)
+    except _UncachedTranscription as e:
+        return e.result
+
+def _show_transcription_progress(fraction: float, progress_bar, status_text):
+    """Map worker progress onto the Step 1 progress bar and status line"""
+    progress_bar.progress(int(20 + fraction * 70))
+    if fraction < 0.7:
         status_text.text("🎤 Transcribing audio with AI...")
-        progress_bar.progress(20)
-        
-        transcription_result = processor.transcribe_audio(tmp_file_path)
-        
-        if not transcription_result:
-            st.error("Failed to transcribe audio. Please try again with a different file.")
-            os.unlink(tmp_file_path)
-            return
-        
-        progress_bar.progress(60)
+    else:
         status_text.text("⏱️ Extracting word-level timestamps...")
-        
-        # Step 2: Get word-level timestamps
-        word_timestamps = processor.get_word_timestamps(tmp_file_path)
-        
-        if not word_timestamps:
-            st.error("Failed to extract word timestamps. Please try again.")
-            os.unlink(tmp_file_path)
-            return
-        
-        progress_bar.progress(90)
-        status_text.text("✅ Processing complete!")
-        
-        # Store results
-        st.session_state.transcription_data = {
-            'text': transcription_result,
-            'word_timestamps': word_timestamps,
-            'audio_path': tmp_file_path
-        }
-        st.session_state.edited_text = transcription_result
-        
-        progress_bar.progress(100)
-        time.sleep(1)
-        
-        # Move to next step
-        st.session_state.step = 2
-        st.success("🎉 Audio processing complete! Moving to customization...")
-        time.sleep(2)
-        st.rerun()
-        
+
+def wait_for_transcription():
+    """Show progress for the pending transcription job and store its results"""
+    job = st.session_state.transcription_job
+    future = job['future']
+    tmp_file_path = job['audio_path']
+    
+    # Progress tracking
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    # Drain progress reported by the worker; each update also gives Streamlit
+    # a chance to interrupt this run, and the job is picked up again on the next
+    while True:
+        _show_transcription_progress(job['progress'], progress_bar, status_text)
+        if future.done() and job['progress_queue'].empty():
+            break
+        try:
+            tag, value = job['progress_queue'].get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if tag == 'progress':
+            job['progress'] = value
+    
+    st.session_state.transcription_job = None
+    
+    try:
+        transcription_result, word_timestamps = future.result()
     except Exception as e:
         st.error(f"Error processing audio: {str(e)}")
-        if 'tmp_file_path' in locals():
-            os.unlink(tmp_file_path)
+        return
+    
+    if not transcription_result:
+        st.error("Failed to transcribe audio. Please try again with a different file.")
+        return
+    
+    if not word_timestamps:
+        st.error("Failed to extract word timestamps. Please try again.")
+        return
+    
+    progress_bar.progress(90)
+    status_text.text("✅ Processing complete!")
+    
+    # Store results
+    st.session_state.transcription_data = {
+        'id': uuid.uuid4().hex,
+        'text': transcription_result,
+        'word_timestamps': word_timestamps,
+        'audio_digest': job['audio_digest'],
+        'audio_path': tmp_file_path
+    }
+    st.session_state.edited_text = transcription_result
+    
+    progress_bar.progress(100)
+    
+    # Move to next step; Step 2 announces the result
+    st.session_state.step = 2
+    st.session_state.just_processed = True
+    st.rerun()
 
 def step_2_review_and_customize():
     st.header("Step 2: Review & Customize")
     
+    if st.session_state.pop('just_processed', False):
+        st.toast("🎉 Audio processing complete! Moving to customization...")
+    
     if st.session_state.transcription_data is None:
         st.error("No transcription data found. Please go back to Step 1.")
         if st.button("← Back to Step 1"):
@@ -233,71 +333,14 @@ def step_2_review_and_customize():
         st.session_state.edited_text = edited_text
         
         # Word count
-        if edited_text:
-            word_count = len(edited_text.split())
-            st.caption(f"Word count: {word_count}")
-        else:
-            st.caption("Word count: 0")
+        st.caption(f"Word count: {_word_count(edited_text)}")
         
         # Preview synchronized text
         if st.button("🔍 Preview Synchronization"):
             show_sync_preview()
     
     with col2:
-        st.subheader("🎨 Video Style Customization")
-        
-        # Animation style
-        animation_style = st.selectbox(
-            "Animation Style",
-            ["Karaoke Style", "Pop-up Word", "Line-by-Line", "Fade In/Out"],
-            index=0
-        )
-        st.session_state.video_style['animation_style'] = animation_style
-        
-        # Colors
-        st.markdown("**Colors**")
-        text_color = st.color_picker("Text Color", st.session_state.video_style['text_color'])
-        highlight_color = st.color_picker("Highlight Color", st.session_state.video_style['highlight_color'])
-        background_color = st.color_picker("Background Color", st.session_state.video_style['background_color'])
-        
-        st.session_state.video_style.update({
-            'text_color': text_color,
-            'highlight_color': highlight_color,
-            'background_color': background_color
-        })
-        
-        # Typography
-        st.markdown("**Typography**")
-        font_family = st.selectbox(
-            "Font Family",
-            ["Arial", "Helvetica", "Times New Roman", "Courier", "Verdana"],
-            index=0
-        )
-        font_size = st.slider("Font Size", 24, 72, st.session_state.video_style['font_size'])
-        
-        st.session_state.video_style.update({
-            'font_family': font_family,
-            'font_size': font_size
-        })
-        
-        # Style preview
-        st.markdown("**Style Preview**")
-        preview_html = f"""
-        <div style="
-            background-color: {background_color};
-            color: {text_color};
-            font-family: {font_family};
-            font-size: {font_size//2}px;
-            padding: 20px;
-            text-align: center;
-            border-radius: 10px;
-            margin: 10px 0;
-        ">
-            Sample lyrics text<br>
-            <span style="color: {highlight_color}; font-weight: bold;">highlighted word</span>
-        </div>
-        """
-        st.markdown(preview_html, unsafe_allow_html=True)
+        _style_panel()
     
     # Navigation buttons
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -312,6 +355,53 @@ def step_2_review_and_customize():
             st.session_state.step = 3
             st.rerun()
 
+@st.fragment
+def _style_panel():
+    """Style customization column; widget changes rerun only this fragment"""
+    st.subheader("🎨 Video Style Customization")
+    
+    # Animation style
+    animation_style = st.selectbox(
+        "Animation Style",
+        ["Karaoke Style", "Pop-up Word", "Line-by-Line", "Fade In/Out"],
+        index=0
+    )
+    
+    # Colors
+    st.markdown("**Colors**")
+    text_color = st.color_picker("Text Color", st.session_state.video_style['text_color'])
+    highlight_color = st.color_picker("Highlight Color", st.session_state.video_style['highlight_color'])
+    background_color = st.color_picker("Background Color", st.session_state.video_style['background_color'])
+    
+    # Typography
+    st.markdown("**Typography**")
+    font_family = st.selectbox(
+        "Font Family",
+        ["Arial", "Helvetica", "Times New Roman", "Courier", "Verdana"],
+        index=0
+    )
+    font_size = st.slider("Font Size", 24, 72, st.session_state.video_style['font_size'])
+    
+    # Store the style in one write, and only when something changed
+    new_style = {
+        'animation_style': animation_style,
+        'text_color': text_color,
+        'highlight_color': highlight_color,
+        'background_color': background_color,
+        'font_family': font_family,
+        'font_size': font_size
+    }
+    if new_style != st.session_state.video_style:
+        st.session_state.video_style = new_style
+    
+    # Style preview
+    st.markdown("**Style Preview**")
+    preview_html = _style_preview(
+        tuple(sorted(st.session_state.video_style.items())),
+        ("Sample lyrics text", "highlighted word")
+    )
+    st.markdown(preview_html, unsafe_allow_html=True)
+
 def show_sync_preview():
     """Show a preview of synchronized text"""
     st.subheader("🎵 Synchronization Preview")
@@ -321,15 +411,8 @@ def show_sync_preview():
         
         # Show first 10 words with timestamps
         st.markdown("**Sample word timings:**")
-        preview_data = []
-        for i, word_data in enumerate(words_data[:10]):
-            start_time = format_timestamp(word_data.get('start', 0))
-            end_time = format_timestamp(word_data.get('end', 0))
-            word = word_data.get('word', 'N/A')
-            preview_data.append(f"{start_time} - {end_time}: '{word}'")
-        
-        for item in preview_data:
-            st.code(item)
+        preview_data = _preview_timings(st.session_state.transcription_data['id'], words_data, 10)
+        st.dataframe(preview_data, hide_index=True, use_container_width=True)
         
         if len(words_data) > 10:
             st.caption(f"... and {len(words_data) - 10} more words")
@@ -360,18 +443,17 @@ def step_3_export():
     
     with col2:
         if word_timestamps:
-            avg_word_duration = sum(w['end'] - w['start'] for w in word_timestamps) / len(word_timestamps)
+            starts = word_timestamps.starts
+            ends = word_timestamps.ends
+            avg_word_duration = float((ends - starts).mean())
             st.metric("Avg Word Duration", f"{avg_word_duration:.2f}s")
-            st.metric("Words per Minute", f"{len(word_timestamps) / (get_audio_duration_seconds(audio_path) / 60):.0f}")
+            st.metric("Words per Minute", f"{len(starts) / (get_audio_duration_seconds(audio_path) / 60):.0f}")
     
     # Preview synchronized text with timestamps
     st.markdown("**Synchronized Text Preview:**")
     preview_container = st.container()
     with preview_container:
-        preview_text = ""
-        for i, word_data in enumerate(word_timestamps[:20]):  # Show first 20 words
-            timestamp = f"[{word_data['start']:.1f}s]"
-            preview_text += f"{timestamp} {word_data['word']} "
+        preview_text = ' '.join(_preview_lines(st.session_state.transcription_data['id'], word_timestamps, 20))
         if len(word_timestamps) > 20:
             preview_text += f"\n... and {len(word_timestamps) - 20} more words"
         st.code(preview_text, language=None)
@@ -379,6 +461,25 @@ def step_3_export():
     st.divider()
     
     # Export options
+    _export_buttons()
+    
+    # Navigation
+    st.divider()
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    with col1:
+        if st.button("← Back to Customize"):
+            st.session_state.step = 2
+            st.rerun()
+    
+    with col3:
+        if st.button("🔄 Start Over"):
+            reset_session()
+            st.rerun()
+
+@st.fragment
+def _export_buttons():
+    """Export columns; clicks here rerun only this fragment, not the Step 3 preview"""
     col1, col2 = st.columns(2)
     
     with col1:
@@ -394,20 +495,6 @@ def step_3_export():
         
         if st.button("🎥 Generate Video Summary", type="primary", use_container_width=True):
             export_mp4()
-    
-    # Navigation
-    st.divider()
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col1:
-        if st.button("← Back to Customize"):
-            st.session_state.step = 2
-            st.rerun()
-    
-    with col3:
-        if st.button("🔄 Start Over"):
-            reset_session()
-            st.rerun()
 
 def export_mp3():
     """Export MP3 file with embedded SYLT lyrics"""
@@ -418,23 +505,25 @@ def export_mp3():
         status_text.text("تحضير ملف MP3 مع الكلمات المتزامنة...")
         progress_bar.progress(20)
         
-        # Initialize MP3 embedder
-        embedder = MP3Embedder()
+        # Get the shared MP3 embedder
+        embedder = get_mp3_embedder()
         
         # Prepare lyrics data
-        word_timestamps = st.session_state.transcription_data['word_timestamps']
-        audio_path = st.session_state.transcription_data['audio_path']
+        transcription_data = st.session_state.transcription_data
         
         progress_bar.progress(50)
         status_text.text("دمج إطار SYLT للتوافق مع الهواتف المحمولة...")
         
-        # Create output file
-        output_filename = f"synced_{st.session_state.audio_file.name}"
-        output_path = embedder.embed_sylt_lyrics(
-            audio_path, 
-            word_timestamps, 
+        # Create output file, reusing the one built for the same audio and text
+        output_filename = f"synced_{Path(st.session_state.audio_file.name).stem}.mp3"
+        output_path = _cached_export(
+            _build_mp3,
+            transcription_data['audio_digest'],
             st.session_state.edited_text,
-            output_filename
+            transcription_data['word_timestamps'].digest(),
+            output_filename,
+            transcription_data['audio_path'],
+            transcription_data['word_timestamps']
         )
         
         progress_bar.progress(90)
@@ -449,10 +538,8 @@ def export_mp3():
             file_size_mb = file_size / (1024 * 1024)
             st.info(f"حجم الملف: {file_size_mb:.2f} MB")
             
-            # Audio player for preview
-            with open(output_path, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-                st.audio(audio_bytes, format='audio/mp3')
+            # Audio player for preview, loaded by Streamlit straight from disk
+            st.audio(output_path, format='audio/mp3')
             
             # Verification info
             verification = embedder.verify_sylt_embedding(output_path)
@@ -461,14 +548,15 @@ def export_mp3():
             else:
                 st.warning("تحذير: قد تكون هناك مشكلة في دمج الكلمات المتزامنة")
             
-            # Download button
-            st.download_button(
-                label="تحميل ملف MP3 المتزامن",
-                data=audio_bytes,
-                file_name=output_filename,
-                mime="audio/mpeg",
-                use_container_width=True
-            )
+            # Download button, handed the open file rather than a bytes copy
+            with open(output_path, 'rb') as file:
+                st.download_button(
+                    label="تحميل ملف MP3 المتزامن",
+                    data=file,
+                    file_name=output_filename,
+                    mime="audio/mpeg",
+                    use_container_width=True
+                )
             
             progress_bar.progress(100)
             st.success("تم تصدير MP3 بنجاح! الملف يحتوي على كلمات متزامنة متوافقة مع مشغلات الهواتف المحمولة.")
@@ -487,25 +575,25 @@ def export_mp4():
         status_text.text("إنشاء فيديو متزامن...")
         progress_bar.progress(20)
         
-        # Initialize video generator
-        generator = VideoGenerator()
-        
         # Prepare video data
-        word_timestamps = st.session_state.transcription_data['word_timestamps']
-        audio_path = st.session_state.transcription_data['audio_path']
+        transcription_data = st.session_state.transcription_data
+        word_timestamps = transcription_data['word_timestamps']
         video_style = st.session_state.video_style
         
         progress_bar.progress(40)
         status_text.text("تطبيق التصميم المخصص...")
         
-        # Generate synchronized video
+        # Generate synchronized video, reusing one built for the same inputs
         output_filename = f"synced_video_{Path(st.session_state.audio_file.name).stem}.mp4"
-        output_path = generator.create_synchronized_video(
-            audio_path,
-            word_timestamps,
+        output_path = _cached_export(
+            _build_video,
+            transcription_data['audio_digest'],
             st.session_state.edited_text,
-            video_style,
-            output_filename
+            word_timestamps.digest(),
+            tuple(sorted(video_style.items())),
+            output_filename,
+            transcription_data['audio_path'],
+            word_timestamps
         )
         
         progress_bar.progress(80)
@@ -553,38 +641,22 @@ def export_mp4():
             - حجم الخط: {video_style.get('font_size', 'غير محدد')}
             """)
             
-            # Download button
-            if output_path.endswith('.mp4'):
-                # Download MP4 video file
-                with open(output_path, 'rb') as file:
-                    st.download_button(
-                        label="تحميل الفيديو MP4",
-                        data=file.read(),
-                        file_name=output_filename,
-                        mime="video/mp4",
-                        use_container_width=True
-                    )
-            elif output_path.endswith('.m4a'):
-                # Download M4A audio file  
-                with open(output_path, 'rb') as file:
-                    st.download_button(
-                        label="تحميل ملف الصوت M4A",
-                        data=file.read(),
-                        file_name=output_filename.replace('.mp4', '.m4a'),
-                        mime="audio/mp4",
-                        use_container_width=True
-                    )
-            else:
-                # Download text file
-                with open(output_path, 'r', encoding='utf-8') as file:
-                    file_content = file.read()
-                    st.download_button(
-                        label="تحميل ملخص الفيديو",
-                        data=file_content.encode('utf-8'),
-                        file_name=output_filename,
-                        mime="text/plain",
-                        use_container_width=True
-                    )
+            # Download button for whichever kind of file the generator produced,
+            # handed the open file rather than a bytes copy
+            download_kinds = {
+                '.mp4': ("تحميل الفيديو MP4", "video/mp4"),
+                '.m4a': ("تحميل ملف الصوت M4A", "audio/mp4"),
+            }
+            output_suffix = Path(output_path).suffix
+            label, mime = download_kinds.get(output_suffix, ("تحميل ملخص الفيديو", "text/plain"))
+            with open(output_path, 'rb') as file:
+                st.download_button(
+                    label=label,
+                    data=file,
+                    file_name=Path(output_filename).with_suffix(output_suffix).name,
+                    mime=mime,
+                    use_container_width=True
+                )
             
             if output_path.endswith('.mp4'):
                 st.success("تم إنشاء الفيديو بنجاح! يمكنك الآن تحميل ملف MP4 مع النص المتزامن.")
@@ -597,12 +669,121 @@ def export_mp4():
             st.markdown("**معاينة كيف سيبدو الفيديو:**")
             
             # Create a visual preview using HTML/CSS
-            preview_html = f"""
+            preview_html = _video_preview(
+                tuple(sorted(video_style.items())),
+                (
+                    _preview_words(st.session_state.transcription_data['id'], word_timestamps, 8),
+                    word_timestamps.words[0] if word_timestamps else 'كلمة'
+                )
+            )
+            st.markdown(preview_html, unsafe_allow_html=True)
+            
+        else:
+            st.error("فشل في إنشاء ملف الفيديو.")
+            
+    except Exception as e:
+        st.error(f"خطأ في تصدير الفيديو: {str(e)}")
+
+# Export builders. A re-transcription of the same audio can yield different word
+# timings (fallback results are never cached), so outputs are keyed on the audio
+# digest, the edited text, a digest of the timings (and style); the files get a key prefix
+# so differently keyed outputs never overwrite each other in the shared work dir,
+# and st.cache_data computes one key at a time, so no export lock is needed.
+def _export_key(*parts: str) -> str:
+    """Short digest identifying one set of export inputs"""
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _build_mp3(audio_digest: str, text: str, timings_digest: str, output_filename: str,
+               _audio_path: str, _word_timestamps: WordTimings) -> str:
+    """Embed the lyrics once per (audio, text, timings); repeat clicks reuse the file"""
+    key = _export_key(audio_digest, text, timings_digest)
+    return get_mp3_embedder().embed_sylt_lyrics(
+        _audio_path, _word_timestamps, text, f"{key}_{output_filename}"
+    )
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _build_video(audio_digest: str, text: str, timings_digest: str, style_items: tuple,
+                 output_filename: str, _audio_path: str, _word_timestamps: WordTimings) -> str:
+    """Render the video once per (audio, text, timings, style); repeat clicks reuse the file"""
+    key = _export_key(audio_digest, text, timings_digest, repr(style_items))
+    return get_video_generator().create_synchronized_video(
+        _audio_path, _word_timestamps, text, dict(style_items), f"{key}_{output_filename}"
+    )
+
+def _cached_export(builder, *args) -> str:
+    """Call a cached export builder, rebuilding if its output file has since been removed"""
+    output_path = builder(*args)
+    if not output_path or not os.path.exists(output_path):
+        # Rebuild just this export with the uncached function; output names are
+        # derived from the inputs, so the cached entry points at the file again.
+        # builder.clear() would drop every session's cached exports.
+        output_path = builder.__wrapped__(*args)
+    return output_path
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _word_count(text: str) -> int:
+    """Count the words of the edited text once per distinct text, not per rerun"""
+    return len(text.split()) if text else 0
+
+# Preview text helpers. A transcription never changes once stored, so results
+# are keyed on its id and the word list itself (underscore arg) is not hashed.
+@st.cache_data(show_spinner=False, max_entries=32)
+def _preview_words(transcription_id: str, _word_timestamps: WordTimings, n: int) -> str:
+    """Join the first n transcribed words"""
+    return ' '.join(_word_timestamps.words[:n])
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _preview_lines(transcription_id: str, _word_timestamps: WordTimings, n: int) -> List[str]:
+    """Build "[start] word" entries for the first n transcribed words"""
+    return [
+        f"[{start:.1f}s] {word}"
+        for start, word in zip(_word_timestamps.starts[:n].tolist(), _word_timestamps.words[:n])
+    ]
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _preview_timings(transcription_id: str, _word_timestamps: WordTimings, n: int) -> Dict[str, List[str]]:
+    """Build start/end/word table columns for the first n transcribed words"""
+    return {
+        'Start': [format_timestamp(start) for start in _word_timestamps.starts[:n].tolist()],
+        'End': [format_timestamp(end) for end in _word_timestamps.ends[:n].tolist()],
+        'Word': _word_timestamps.words[:n]
+    }
+
+# Style preview markup, cached on the style so picker reruns that leave the
+# style unchanged skip rebuilding the HTML
+@st.cache_data(show_spinner=False, max_entries=32)
+def _style_preview(style_items: tuple, sample_words: tuple) -> str:
+    """Build the Step 2 style preview HTML"""
+    style = dict(style_items)
+    sample_text, highlighted_word = sample_words
+    return f"""
+        <div style="
+            background-color: {style['background_color']};
+            color: {style['text_color']};
+            font-family: {style['font_family']};
+            font-size: {style['font_size']//2}px;
+            padding: 20px;
+            text-align: center;
+            border-radius: 10px;
+            margin: 10px 0;
+        ">
+            {sample_text}<br>
+            <span style="color: {style['highlight_color']}; font-weight: bold;">{highlighted_word}</span>
+        </div>
+        """
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _video_preview(style_items: tuple, sample_words: tuple) -> str:
+    """Build the HTML preview of how the exported video will look"""
+    style = dict(style_items)
+    preview_text, highlighted_word = sample_words
+    return f"""
             <div style="
-                background: {video_style.get('background_color', '#000000')};
-                color: {video_style.get('text_color', '#FFFFFF')};
-                font-family: {video_style.get('font_family', 'Arial')};
-                font-size: {video_style.get('font_size', 48) // 3}px;
+                background: {style.get('background_color', '#000000')};
+                color: {style.get('text_color', '#FFFFFF')};
+                font-family: {style.get('font_family', 'Arial')};
+                font-size: {style.get('font_size', 48) // 3}px;
                 padding: 30px;
                 text-align: center;
                 border-radius: 10px;
@@ -616,34 +797,33 @@ def export_mp4():
             ">
                 <div style="margin-bottom: 20px; font-size: 14px; color: #888;">معاينة الفيديو</div>
                 <div>
-                    {' '.join([w['word'] for w in word_timestamps[:8]])}
+                    {preview_text}
                 </div>
                 <div style="margin-top: 10px;">
-                    <span style="color: {video_style.get('highlight_color', '#FFD700')}; font-weight: bold;">
-                        {word_timestamps[0]['word'] if word_timestamps else 'كلمة'}
+                    <span style="color: {style.get('highlight_color', '#FFD700')}; font-weight: bold;">
+                        {highlighted_word}
                     </span>
                 </div>
                 <div style="margin-top: 20px; font-size: 12px; color: #666;">
-                    نمط الحركة: {video_style.get('animation_style', 'Karaoke Style')}
+                    نمط الحركة: {style.get('animation_style', 'Karaoke Style')}
                 </div>
             </div>
             """
-            st.markdown(preview_html, unsafe_allow_html=True)
-            
-        else:
-            st.error("فشل في إنشاء ملف الفيديو.")
-            
-    except Exception as e:
-        st.error(f"خطأ في تصدير الفيديو: {str(e)}")
 
 def get_audio_duration_seconds(audio_path: str) -> float:
     """Get audio duration in seconds"""
     try:
-        audio_info = get_audio_info(audio_path)
-        return audio_info.get('duration', 0)
+        # The modification time is part of the cache key so a rewritten file is re-read
+        return _cached_audio_duration(audio_path, os.path.getmtime(audio_path))
     except:
         return 0
 
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_audio_duration(audio_path: str, mtime: float) -> float:
+    """Read the audio duration once per (path, mtime)"""
+    audio_info = get_audio_info(audio_path)
+    return audio_info.get('duration', 0)
+
 def get_audio_duration_formatted(audio_path: str) -> str:
     """Get formatted audio duration"""
     duration = get_audio_duration_seconds(audio_path)
@@ -651,23 +831,49 @@ def get_audio_duration_formatted(audio_path: str) -> str:
     seconds = int(duration % 60)
     return f"{minutes}:{seconds:02d}"
 
+def get_session_audio_path(suffix: str) -> str:
+    """Get the temp path holding this session's upload, reused across processing attempts"""
+    tmp_audio_path = st.session_state.get('tmp_audio_path')
+    if tmp_audio_path is None or not tmp_audio_path.endswith(suffix):
+        # The suffix is kept so format detection by extension keeps working
+        remove_session_audio()
+        fd, tmp_audio_path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        get_session_audio_paths().add(tmp_audio_path)
+        st.session_state.tmp_audio_path = tmp_audio_path
+    return tmp_audio_path
+
+def remove_session_audio():
+    """Delete this session's upload temp file, if any"""
+    tmp_audio_path = st.session_state.get('tmp_audio_path')
+    if tmp_audio_path is not None:
+        _remove_file(tmp_audio_path)
+        get_session_audio_paths().discard(tmp_audio_path)
+        st.session_state.tmp_audio_path = None
+
+@st.cache_resource
+def get_session_audio_paths() -> set:
+    """Get the process-wide set of session upload files, removed by one handler at exit"""
+    paths = set()
+    
+    def remove_all():
+        for path in list(paths):
+            _remove_file(path)
+    
+    atexit.register(remove_all)
+    return paths
+
+def _remove_file(path: str):
+    """Delete a file if it still exists"""
+    if os.path.exists(path):
+        os.unlink(path)
+
 def reset_session():
     """Reset all session state variables"""
+    remove_session_audio()
     for key in list(st.session_state.keys()):
-        if key not in ['step']:
-            del st.session_state[key]
-    st.session_state.step = 1
-    st.session_state.audio_file = None
-    st.session_state.transcription_data = None
-    st.session_state.edited_text = ""
-    st.session_state.video_style = {
-        'animation_style': 'Karaoke Style',
-        'text_color': '#FFFFFF',
-        'highlight_color': '#FFD700',
-        'background_color': '#000000',
-        'font_family': 'Arial',
-        'font_size': 48
-    }
+        del st.session_state[key]
+    init_session_state()
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,19 @@
 import os
 from dotenv import load_dotenv
 import tempfile
-from typing import List, Dict, Optional
+import queue
+from operator import methodcaller
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import json
 import librosa
 import numpy as np
 from google import genai
 from google.genai import types
 
+# Placeholder text returned in place of a transcription when Gemini cannot provide one
+FALLBACK_NOTICE = "Please edit this text to match your audio content."
+
 class AudioProcessor:
     """Handles audio transcription and word-level timestamp extraction using Gemini AI"""
     
@@ -49,7 +55,7 @@ class AudioProcessor:
             
             if not self.client:
                 # Fallback to sample text if Gemini is not available
-                return "Please edit this text to match your audio content. Gemini transcription is not available."
+                return f"{FALLBACK_NOTICE} Gemini transcription is not available."
             
             # Read audio file as bytes
             with open(audio_file_path, 'rb') as f:
@@ -81,11 +87,58 @@ class AudioProcessor:
             if response and response.text:
                 return response.text.strip()
             else:
-                return "Please edit this text to match your audio content. Transcription failed."
+                return f"{FALLBACK_NOTICE} Transcription failed."
                 
         except Exception as e:
             print(f"Error transcribing audio: {str(e)}")
-            return "Please edit this text to match your audio content. An error occurred during transcription."
+            return f"{FALLBACK_NOTICE} An error occurred during transcription."
+    
+    @staticmethod
+    def is_fallback_text(text: Optional[str]) -> bool:
+        """Check whether a transcription is the placeholder returned on failure"""
+        return not text or text.startswith(FALLBACK_NOTICE)
+    
+    def transcribe_and_align(self, audio_file_path: str,
+                             progress_q: Optional[queue.Queue] = None) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Transcribe audio and build word-level timestamps from a single transcription
+        
+        The audio duration is read on a worker thread while the transcription
+        request is in flight, as the two do not depend on each other.
+        
+        Args:
+            audio_file_path: Path to the audio file
+            progress_q: Optional queue receiving ('progress', fraction) tuples as work completes
+            
+        Returns:
+            Tuple of (transcribed text or None, list of word timestamp dictionaries)
+        """
+        def report(fraction: float):
+            if progress_q is not None:
+                progress_q.put(('progress', fraction))
+        
+        try:
+            if not os.path.exists(audio_file_path):
+                raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+            
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                duration_future = pool.submit(self.get_audio_duration, audio_file_path)
+                report(0.1)
+                transcription = self.transcribe_audio(audio_file_path)
+                report(0.7)
+                audio_duration = duration_future.result()
+                report(0.8)
+            
+            if not transcription:
+                return None, []
+            
+            word_timestamps = self._align_words(transcription, audio_duration)
+            report(1.0)
+            return transcription, word_timestamps
+            
+        except Exception as e:
+            print(f"Error transcribing and aligning audio: {str(e)}")
+            return None, []
     
     def get_word_timestamps(self, audio_file_path: str) -> List[Dict]:
         """
@@ -108,52 +161,66 @@ class AudioProcessor:
             
             # Get audio duration
             audio_duration = self.get_audio_duration(audio_file_path)
-            if audio_duration <= 0:
-                return []
-            
-            # Split transcription into words
-            words = transcription.split()
-            if not words:
-                return []
-            
-            # Calculate timing for each word
-            word_timestamps = []
-            total_words = len(words)
-            
-            for i, word in enumerate(words):
-                # Distribute words evenly across the audio duration
-                # Leave some silence at the beginning and end
-                start_offset = 0.5  # 0.5 seconds at start
-                end_offset = 0.5    # 0.5 seconds at end
-                usable_duration = audio_duration - start_offset - end_offset
-                
-                if total_words == 1:
-                    start_time = start_offset
-                    end_time = audio_duration - end_offset
-                else:
-                    # Calculate word timing
-                    word_duration = usable_duration / total_words
-                    start_time = start_offset + (i * word_duration)
-                    end_time = start_offset + ((i + 1) * word_duration)
-                
-                # Add some variation to make it more natural
-                if i > 0:
-                    # Small gap between words
-                    start_time += 0.05
-                
-                word_data = {
-                    'word': word.strip(),
-                    'start': round(start_time, 3),
-                    'end': round(end_time, 3)
-                }
-                word_timestamps.append(word_data)
             
-            return word_timestamps
+            return self._align_words(transcription, audio_duration)
             
         except Exception as e:
             print(f"Error creating word timestamps: {str(e)}")
             return []
     
+    def _align_words(self, transcription: str, audio_duration: float) -> List[Dict]:
+        """
+        Distribute the words of a transcription across the audio duration
+        
+        Args:
+            transcription: Transcribed text
+            audio_duration: Total duration of audio in seconds
+            
+        Returns:
+            List of dictionaries with word, start, and end timestamps
+        """
+        if audio_duration <= 0:
+            return []
+        
+        # Split transcription into words
+        words = transcription.split()
+        if not words:
+            return []
+        
+        # Calculate timing for each word
+        word_timestamps = []
+        total_words = len(words)
+        
+        for i, word in enumerate(words):
+            # Distribute words evenly across the audio duration
+            # Leave some silence at the beginning and end
+            start_offset = 0.5  # 0.5 seconds at start
+            end_offset = 0.5    # 0.5 seconds at end
+            usable_duration = audio_duration - start_offset - end_offset
+            
+            if total_words == 1:
+                start_time = start_offset
+                end_time = audio_duration - end_offset
+            else:
+                # Calculate word timing
+                word_duration = usable_duration / total_words
+                start_time = start_offset + (i * word_duration)
+                end_time = start_offset + ((i + 1) * word_duration)
+            
+            # Add some variation to make it more natural
+            if i > 0:
+                # Small gap between words
+                start_time += 0.05
+            
+            word_data = {
+                'word': word.strip(),
+                'start': round(start_time, 3),
+                'end': round(end_time, 3)
+            }
+            word_timestamps.append(word_data)
+        
+        return word_timestamps
+    
     def get_audio_duration(self, audio_file_path: str) -> float:
         """
         Get the duration of the audio file in seconds
@@ -165,9 +232,9 @@ class AudioProcessor:
             Duration in seconds
         """
         try:
-            audio_data, sample_rate = librosa.load(audio_file_path)
-            duration = len(audio_data) / sample_rate
-            return duration
+            # Read the length from the file header rather than decoding and
+            # resampling the whole track just to count its samples
+            return float(librosa.get_duration(path=audio_file_path))
         except Exception as e:
             print(f"Error getting audio duration: {str(e)}")
             return 0.0
@@ -222,6 +289,10 @@ class AudioProcessor:
         sentences = []
         current_sentence = []
         
+        # C-level word lookup and join; .get keeps words without a 'word' key as ''
+        get_word = methodcaller('get', 'word', '')
+        join = ' '.join
+        
         for word_data in word_timestamps:
             current_sentence.append(word_data)
             
@@ -232,7 +303,7 @@ class AudioProcessor:
                 
                 if current_sentence:
                     sentence_data = {
-                        'text': ' '.join([w.get('word', '') for w in current_sentence]).strip(),
+                        'text': join(map(get_word, current_sentence)).strip(),
                         'start': current_sentence[0].get('start', 0),
                         'end': current_sentence[-1].get('end', 0),
                         'words': current_sentence.copy()
@@ -243,7 +314,7 @@ class AudioProcessor:
         # Add remaining words as final sentence
         if current_sentence:
             sentence_data = {
-                'text': ' '.join([w.get('word', '') for w in current_sentence]).strip(),
+                'text': join(map(get_word, current_sentence)).strip(),
                 'start': current_sentence[0].get('start', 0),
                 'end': current_sentence[-1].get('end', 0),
                 'words': current_sentence.copy()
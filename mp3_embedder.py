@@ -1,18 +1,75 @@
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3
-from mutagen.id3._frames import SYLT, USLT
-from mutagen.id3._specs import Encoding
 import os
-import tempfile
-import shutil
-from typing import List, Dict
+import uuid
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Tuple, Optional
+import numpy as np
+from utils import get_audio_codec, clone_file, WordTimings, SharedTempDir
+
+# mutagen is imported inside the methods that tag files, so merely creating an
+# embedder (or importing this module) does not load it
+if TYPE_CHECKING:
+    from mutagen.id3 import ID3, SYLT
+
+try:
+    import av  # Optional: PyAV encodes in-process instead of spawning ffmpeg
+except ImportError:
+    av = None
+
+# Headroom reserved after the ID3 tag when it has to grow, so a later re-tag fits in place
+ID3_PADDING = 4096
+
+def _tag_padding(info) -> int:
+    """Keep the existing padding when the tag still fits, otherwise reserve ID3_PADDING"""
+    return info.padding if info.padding >= 0 else ID3_PADDING
+
+def _timing_columns(word_timestamps) -> Tuple[List[str], np.ndarray]:
+    """Split word timestamps into parallel word and start-time (seconds) columns"""
+    if isinstance(word_timestamps, WordTimings):
+        return word_timestamps.words, word_timestamps.starts
+    words = [w.get('word', '') for w in word_timestamps]
+    starts = np.fromiter((w.get('start', 0) for w in word_timestamps),
+                         dtype=np.float64, count=len(words))
+    return words, starts
+
+def _read_tags(mp3_path: str) -> Optional['ID3']:
+    """Read only the ID3v2 tag of a file, without scanning its MPEG frames; None if untagged"""
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    try:
+        return ID3(mp3_path)
+    except ID3NoHeaderError:
+        return None
 
 class MP3Embedder:
     """Handles embedding SYLT synchronized lyrics into MP3 files"""
     
-    def __init__(self):
-        """Initialize the MP3 embedder"""
-        self.temp_dir = tempfile.mkdtemp()
+    _shared_dir = SharedTempDir('syncmaster_mp3_')
+    
+    @classmethod
+    def _get_shared_tempdir(cls) -> str:
+        """Acquire the temp dir shared by all embedders created without a work_dir"""
+        return cls._shared_dir.acquire()
+    
+    def __init__(self, work_dir: Optional[str] = None):
+        """
+        Initialize the MP3 embedder
+        
+        Args:
+            work_dir: Directory for output files, owned by the caller. If omitted, a temp
+                dir shared by all such embedders is used, removed with the last of them.
+        """
+        self._temp_dir = work_dir
+        self._owns_temp_dir = work_dir is None
+        
+        # Embedders sharing the dir keep their files apart with a per-instance prefix
+        self._file_prefix = f"{uuid.uuid4().hex[:8]}_" if work_dir is None else ''
+    
+    @property
+    def temp_dir(self) -> str:
+        """Working directory for output files, created on first use"""
+        if self._temp_dir is None:
+            self._temp_dir = self._get_shared_tempdir()
+        return self._temp_dir
     
     def embed_sylt_lyrics(self, audio_path: str, word_timestamps: List[Dict], 
                          text: str, output_filename: str) -> str:
@@ -30,116 +87,253 @@ class MP3Embedder:
         """
         try:
             # Create output path
-            output_path = os.path.join(self.temp_dir, output_filename)
-            
-            # First convert to MP3 if not already MP3
-            if not audio_path.lower().endswith('.mp3'):
-                # Convert to MP3 using a simple copy for now
-                # In production, this would use ffmpeg or similar
-                import subprocess
-                try:
-                    # Try to convert using ffmpeg if available
-                    subprocess.run(['ffmpeg', '-i', audio_path, '-codec:a', 'mp3', output_path], 
-                                 check=True, capture_output=True)
-                except:
-                    # Fallback: just copy the file
-                    shutil.copy2(audio_path, output_path)
-            else:
-                # Copy MP3 file
-                shutil.copy2(audio_path, output_path)
+            output_path = os.path.join(self.temp_dir, self._file_prefix + output_filename)
+            
+            # Bring the audio into an MP3 file, doing as little work as possible
+            is_mp3 = self._convert_to_mp3(audio_path, output_path)
             
             # Create SYLT frame data first
             sylt_data = self._create_sylt_data(word_timestamps)
             
-            if sylt_data:
-                try:
-                    # Load the MP3 file with error handling
-                    audio_file = MP3(output_path, ID3=ID3)
-                    
-                    # Add ID3 tag if it doesn't exist
-                    if audio_file.tags is None:
-                        audio_file.add_tags()
-                    
-                    # Create SYLT frame with safer encoding
-                    sylt_frame = SYLT(
-                        encoding=Encoding.UTF8,  # Use UTF-8 instead of UTF-16 for better compatibility
-                        lang='eng',  # Language code
-                        format=2,  # Absolute time in milliseconds
-                        type=1,  # Content type: lyrics
-                        text=sylt_data
-                    )
-                    
-                    # Remove any existing SYLT frames first
-                    if hasattr(audio_file.tags, 'delall'):
-                        audio_file.tags.delall('SYLT')
-                    
-                    # Add new SYLT frame
-                    audio_file.tags.add(sylt_frame)
-                    
-                    # Also add unsynchronized lyrics as fallback
-                    uslt_frame = USLT(
-                        encoding=Encoding.UTF8,
-                        lang='eng',
-                        desc='',
-                        text=text
-                    )
-                    
-                    # Remove existing USLT frames
-                    if hasattr(audio_file.tags, 'delall'):
-                        audio_file.tags.delall('USLT')
-                    audio_file.tags.add(uslt_frame)
-                    
-                    # Save the file with error handling
-                    audio_file.save(v2_version=3)  # Use ID3v2.3 for better compatibility
-                    
-                    return output_path
-                    
-                except Exception as save_error:
-                    # If MP3 processing fails, create a simple copy with basic metadata
-                    print(f"MP3 processing failed: {save_error}, creating basic copy")
-                    backup_path = output_path.replace('.mp3', '_backup.mp3')
-                    shutil.copy2(audio_path, backup_path)
-                    return backup_path
+            if sylt_data and is_mp3:
+                from mutagen.id3._frames import USLT
+                from mutagen.id3._specs import Encoding
+                
+                # Also add unsynchronized lyrics as fallback
+                uslt_frame = USLT(
+                    encoding=Encoding.UTF8,
+                    lang='eng',
+                    desc='',
+                    text=text
+                )
+                
+                # Both frames go into the file with a single tag write
+                if not self.embed_frames(output_path, [self._sylt_frame(sylt_data), uslt_frame]):
+                    # The converted file is still valid audio, just without lyrics
+                    print("MP3 processing failed, returning the file without lyrics")
+                return output_path
             else:
-                # If SYLT creation fails, just return the copied file
+                # No lyrics to embed, or the audio could not be made MP3:
+                # return the copied file as is
                 return output_path
                 
         except Exception as e:
-            # Last resort: create a basic copy of the original file
-            try:
-                fallback_path = os.path.join(self.temp_dir, f"copy_{output_filename}")
-                shutil.copy2(audio_path, fallback_path)
-                return fallback_path
-            except:
-                raise Exception(f"Error embedding SYLT lyrics: {str(e)}")
+            raise Exception(f"Error embedding SYLT lyrics: {str(e)}")
     
-    def _create_sylt_data(self, word_timestamps: List[Dict]) -> List[tuple]:
+    def embed_many(self, jobs: List[Dict], max_workers: Optional[int] = None) -> List[str]:
         """
-        Create SYLT data format from word timestamps
+        Embed lyrics into several files in parallel worker processes
+        
+        Conversion and ID3 rewrites of different files are independent, so the
+        work spreads across cores instead of sharing one interpreter.
+        
+        Args:
+            jobs: List of dictionaries with the embed_sylt_lyrics arguments
+                (audio_path, word_timestamps, text, output_filename)
+            max_workers: Number of worker processes (defaults to the CPU count)
+            
+        Returns:
+            List of output paths, in job order
+        """
+        workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        if workers < 2:
+            return [self.embed_sylt_lyrics(**job) for job in jobs]
+        
+        # Workers write straight into this embedder's directory
+        work_dir = self.temp_dir
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(_embed_one, [
+                    (work_dir, {**job, 'output_filename': self._file_prefix + job['output_filename']})
+                    for job in jobs
+                ]))
+        except Exception as e:
+            print(f"Parallel embedding failed: {e}, embedding in this process")
+            return [self.embed_sylt_lyrics(**job) for job in jobs]
+    
+    def update_sylt_lyrics(self, mp3_path: str, word_timestamps: List[Dict]) -> bool:
+        """
+        Replace the SYLT lyrics of an already tagged MP3 file in place
+        
+        The tag written by embed_sylt_lyrics keeps padding after it, so a re-sync
+        usually rewrites only the ID3 header rather than the whole file.
         
         Args:
+            mp3_path: Path to the MP3 file
             word_timestamps: List of word timestamp dictionaries
             
         Returns:
-            List of tuples (text, timestamp_in_milliseconds)
+            True if the lyrics were updated
         """
         try:
-            sylt_data = []
+            from mutagen.id3 import ID3
             
-            for word_data in word_timestamps:
-                word = word_data.get('word', '').strip()
-                start_time = word_data.get('start', 0)
-                
-                if word:
-                    # Convert seconds to milliseconds
-                    timestamp_ms = int(start_time * 1000)
-                    sylt_data.append((word, timestamp_ms))
+            sylt_data = self._create_sylt_data(word_timestamps)
             
-            return sylt_data
+            tags = ID3(mp3_path)
+            tags.delall('SYLT')
+            if sylt_data:
+                tags.add(self._sylt_frame(sylt_data))
+            self._write_tag(tags, mp3_path)
+            return True
             
         except Exception as e:
-            print(f"Error creating SYLT data: {str(e)}")
-            return []
+            print(f"Error updating SYLT lyrics: {str(e)}")
+            return False
+    
+    def embed_frames(self, mp3_path: str, frames: List) -> bool:
+        """
+        Write several ID3 frames to an MP3 file with a single tag save
+        
+        Each frame replaces any existing frames with the same frame ID, so lyrics,
+        art or title frames added together cost one header rewrite instead of one each.
+        
+        Args:
+            mp3_path: Path to the MP3 file
+            frames: mutagen ID3 frames (SYLT, USLT, APIC, TIT2, ...)
+            
+        Returns:
+            True if the frames were written
+        """
+        try:
+            tags = self._open_tag(mp3_path)
+            
+            by_id = {}
+            for frame in frames:
+                by_id.setdefault(frame.FrameID, []).append(frame)
+            for frame_id, id_frames in by_id.items():
+                tags.setall(frame_id, id_frames)
+            
+            self._write_tag(tags, mp3_path)
+            return True
+            
+        except Exception as e:
+            print(f"Error writing ID3 frames: {str(e)}")
+            return False
+    
+    def _open_tag(self, mp3_path: str) -> 'ID3':
+        """Load only the ID3 tag of a file (the MPEG frames need not be parsed), or a new empty tag"""
+        from mutagen.id3 import ID3, ID3NoHeaderError
+        try:
+            return ID3(mp3_path)
+        except ID3NoHeaderError:
+            return ID3()
+    
+    def _write_tag(self, tags: 'ID3', mp3_path: str) -> None:
+        """Save an ID3 tag as ID3v2.3, keeping any existing ID3v1 tail"""
+        # ID3v2.3 is what most players parse; v1=1 keeps an existing ID3v1 block
+        # (refreshed in place, same 128 bytes) and never adds one, so the file end
+        # does not move, and the padding callback rewrites only the header when
+        # the new tag fits the old one
+        tags.save(mp3_path, v1=1, v2_version=3, padding=_tag_padding)
+    
+    def _sylt_frame(self, sylt_data: List[tuple]) -> 'SYLT':
+        """Create the SYLT frame for (text, timestamp_in_milliseconds) entries"""
+        from mutagen.id3._frames import SYLT
+        from mutagen.id3._specs import Encoding
+        
+        # Use UTF-8 instead of UTF-16 for better compatibility
+        return SYLT(
+            encoding=Encoding.UTF8,
+            lang='eng',  # Language code
+            format=2,  # Absolute time in milliseconds
+            type=1,  # Content type: lyrics
+            text=sylt_data
+        )
+    
+    def _convert_to_mp3(self, audio_path: str, output_path: str):
+        """
+        Write the audio at audio_path to output_path as an MP3 file
+        
+        MP3 input is copied as is. MP3 audio in another container is stream-copied,
+        and only other codecs are re-encoded with LAME, in-process through PyAV
+        when it is installed.
+        
+        Args:
+            audio_path: Path to the original audio file
+            output_path: Path for the MP3 file
+            
+        Returns:
+            True if output_path holds MP3 audio, False if the file was only copied
+        """
+        codec = get_audio_codec(audio_path)
+        is_mp3_file = audio_path.lower().endswith('.mp3')
+        if is_mp3_file and codec in ('mp3', None):
+            # Reflink where possible, so only the ID3 save writes audio bytes;
+            # a hard link would let the tag write reach the user's upload
+            clone_file(audio_path, output_path)
+            return True
+        
+        if codec != 'mp3' and av is not None and self._encode_mp3_with_av(audio_path, output_path):
+            return True
+        
+        attempts = []
+        if codec == 'mp3':
+            attempts.append(['-c:a', 'copy'])
+        attempts.append(['-c:a', 'libmp3lame', '-q:a', '2', '-threads', '0'])
+        
+        for codec_args in attempts:
+            cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                   '-i', audio_path, '-vn'] + codec_args + ['-f', 'mp3', output_path]
+            try:
+                result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.PIPE, text=True)
+                if result.returncode == 0:
+                    return True
+                print(f"FFmpeg conversion failed: {result.stderr.strip()}")
+            except FileNotFoundError:
+                break
+        
+        # Fallback: just copy the file
+        clone_file(audio_path, output_path)
+        return False
+    
+    def _encode_mp3_with_av(self, audio_path: str, output_path: str) -> bool:
+        """
+        Encode the first audio stream of audio_path to MP3 with PyAV
+        
+        Args:
+            audio_path: Path to the original audio file
+            output_path: Path for the MP3 file
+            
+        Returns:
+            True if the MP3 file was written
+        """
+        try:
+            with av.open(audio_path) as source, av.open(output_path, 'w', format='mp3') as target:
+                in_stream = source.streams.audio[0]
+                out_stream = target.add_stream('mp3', rate=in_stream.rate)
+                out_stream.layout = 'mono' if in_stream.channels == 1 else 'stereo'
+                out_stream.bit_rate = 192000
+                
+                # The encoder resamples each frame to its own format and layout
+                for frame in source.decode(in_stream):
+                    frame.pts = None
+                    target.mux(out_stream.encode(frame))
+                target.mux(out_stream.encode(None))
+            return True
+        except Exception as e:
+            print(f"PyAV encoding failed: {str(e)}")
+            return False
+    
+    def _create_sylt_data(self, word_timestamps: List[Dict]) -> List[tuple]:
+        """
+        Create SYLT data format from word timestamps
+        
+        Args:
+            word_timestamps: List of word timestamp dictionaries
+            
+        Returns:
+            List of tuples (text, timestamp_in_milliseconds)
+        """
+        words, starts = _timing_columns(word_timestamps)
+        
+        # Convert seconds to milliseconds in one pass over the start column, rounding
+        # to the nearest ms so float error (4.9 s -> 4899.99) does not lose a millisecond
+        timestamps_ms = np.rint(starts * 1000).astype(np.int64).tolist()
+        
+        return [(word, timestamp_ms)
+                for word, timestamp_ms in zip(map(str.strip, words), timestamps_ms) if word]
     
     def _create_line_based_sylt_data(self, word_timestamps: List[Dict], max_words_per_line: int = 6) -> List[tuple]:
         """
@@ -153,30 +347,15 @@ class MP3Embedder:
             List of tuples (line_text, timestamp_in_milliseconds)
         """
         try:
-            sylt_data = []
-            current_line = []
+            words, starts = _timing_columns(word_timestamps)
             
-            for word_data in word_timestamps:
-                current_line.append(word_data)
-                
-                # Check if we should end this line
-                if len(current_line) >= max_words_per_line:
-                    if current_line:
-                        line_text = ' '.join([w.get('word', '') for w in current_line]).strip()
-                        start_time = current_line[0].get('start', 0)
-                        timestamp_ms = int(start_time * 1000)
-                        
-                        if line_text:
-                            sylt_data.append((line_text, timestamp_ms))
-                        
-                        current_line = []
-            
-            # Add remaining words as final line
-            if current_line:
-                line_text = ' '.join([w.get('word', '') for w in current_line]).strip()
-                start_time = current_line[0].get('start', 0)
-                timestamp_ms = int(start_time * 1000)
-                
+            # Each line is a slice of the word column, timed by its first word
+            line_offsets = range(0, len(words), max_words_per_line)
+            line_starts_ms = np.rint(starts[::max_words_per_line] * 1000).astype(np.int64).tolist()
+            
+            sylt_data = []
+            for offset, timestamp_ms in zip(line_offsets, line_starts_ms):
+                line_text = ' '.join(words[offset:offset + max_words_per_line]).strip()
                 if line_text:
                     sylt_data.append((line_text, timestamp_ms))
             
@@ -197,7 +376,7 @@ class MP3Embedder:
             Dictionary with verification results
         """
         try:
-            audio_file = MP3(mp3_path)
+            tags = _read_tags(mp3_path)
             
             result = {
                 'has_sylt': False,
@@ -206,15 +385,15 @@ class MP3Embedder:
                 'error': None
             }
             
-            if audio_file.tags:
+            if tags:
                 # Check for SYLT
-                sylt_frames = audio_file.tags.getall('SYLT')
+                sylt_frames = tags.getall('SYLT')
                 if sylt_frames:
                     result['has_sylt'] = True
                     result['sylt_entries'] = len(sylt_frames[0].text) if sylt_frames[0].text else 0
                 
                 # Check for USLT (fallback)
-                uslt_frames = audio_file.tags.getall('USLT')
+                uslt_frames = tags.getall('USLT')
                 if uslt_frames:
                     result['has_uslt'] = True
             
@@ -239,11 +418,11 @@ class MP3Embedder:
             List of dictionaries with text and timestamp
         """
         try:
-            audio_file = MP3(mp3_path)
+            tags = _read_tags(mp3_path)
             lyrics_data = []
             
-            if audio_file.tags:
-                sylt_frames = audio_file.tags.getall('SYLT')
+            if tags:
+                sylt_frames = tags.getall('SYLT')
                 
                 for frame in sylt_frames:
                     if frame.text:
@@ -271,40 +450,26 @@ class MP3Embedder:
             Path to the created LRC file
         """
         try:
-            lrc_lines = []
+            words, starts = _timing_columns(word_timestamps)
             
-            # Group words into lines
-            current_line = []
-            for word_data in word_timestamps:
-                current_line.append(word_data)
-                
-                if len(current_line) >= 8:  # 8 words per line
-                    if current_line:
-                        line_text = ' '.join([w.get('word', '') for w in current_line])
-                        start_time = current_line[0].get('start', 0)
-                        
-                        # Format timestamp as [mm:ss.xx]
-                        minutes = int(start_time // 60)
-                        seconds = start_time % 60
-                        timestamp_str = f"[{minutes:02d}:{seconds:05.2f}]"
-                        
-                        lrc_lines.append(f"{timestamp_str}{line_text}")
-                        current_line = []
-            
-            # Add remaining words
-            if current_line:
-                line_text = ' '.join([w.get('word', '') for w in current_line])
-                start_time = current_line[0].get('start', 0)
-                
-                minutes = int(start_time // 60)
-                seconds = start_time % 60
-                timestamp_str = f"[{minutes:02d}:{seconds:05.2f}]"
-                
-                lrc_lines.append(f"{timestamp_str}{line_text}")
+            # Group words into lines of 8, each timed by its first word
+            line_starts = starts[::8]
+            minutes = (line_starts // 60).astype(np.int64)
+            seconds = line_starts - minutes * 60
+            line_texts = map(' '.join, (words[offset:offset + 8] for offset in range(0, len(words), 8)))
             
-            # Write LRC file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(lrc_lines))
+            # Format timestamps as [mm:ss.xx]
+            lrc_lines = [f"[{mm:02d}:{ss:05.2f}]{line_text}"
+                         for mm, ss, line_text in zip(minutes.tolist(), seconds.tolist(), line_texts)]
+            
+            # Write LRC file: encode once and hand the bytes straight to the fd
+            data = memoryview('\n'.join(lrc_lines).encode('utf-8'))
+            fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+            finally:
+                os.close(fd)
             
             return output_path
             
@@ -313,9 +478,15 @@ class MP3Embedder:
     
     def __del__(self):
         """Clean up temporary files"""
-        import shutil
-        if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
+        if not getattr(self, '_owns_temp_dir', False):
+            return
+        if getattr(self, '_temp_dir', None):
             try:
-                shutil.rmtree(self.temp_dir)
+                self._shared_dir.release()
             except:
                 pass
+
+def _embed_one(args: Tuple[str, Dict]) -> str:
+    """Run one MP3Embedder.embed_many job (runs in a worker process)"""
+    work_dir, job = args
+    return MP3Embedder(work_dir=work_dir).embed_sylt_lyrics(**job)
@@ -0,0 +1,73 @@
+"""
+Compatibility shims for older Streamlit releases.
+
+app.py is re-executed on every interaction, but this module is imported once
+per process, so the capability probes below run a single time and current
+Streamlit versions skip patching altogether.
+"""
+import inspect
+import streamlit as st
+
+def _parse_version(version: str) -> tuple:
+    """Parse 'major.minor' from a version string into a comparable tuple"""
+    parts = []
+    for part in version.split('.')[:2]:
+        digits = ''
+        for char in part:
+            if not char.isdigit():
+                break
+            digits += char
+        parts.append(int(digits or 0))
+    return tuple(parts)
+
+ST_VERSION = _parse_version(st.__version__)
+
+if not hasattr(st, "divider"):
+    def _divider():
+        st.markdown("---")
+    st.divider = _divider
+
+if not hasattr(st, "toast"):
+    def _toast(body, icon=None):
+        st.success(body)
+    st.toast = _toast
+
+# Provide st.rerun alias for older Streamlit versions
+if not hasattr(st, "rerun") and hasattr(st, "experimental_rerun"):
+    st.rerun = st.experimental_rerun
+
+# st.fragment is st.experimental_fragment before 1.37; without either, run inline
+if not hasattr(st, "fragment"):
+    if hasattr(st, "experimental_fragment"):
+        st.fragment = st.experimental_fragment
+    else:
+        def _fragment(func=None, **kwargs):
+            if func is None:
+                return lambda f: f
+            return func
+        st.fragment = _fragment
+
+# Button 'type' and 'use_container_width' arguments are available from 1.16 on
+if ST_VERSION < (1, 16):
+    # Patch st.button for Streamlit versions that don't support the 'type' argument (<=1.12)
+    if "type" not in inspect.signature(st.button).parameters:
+        _orig_button = st.button
+
+        def _patched_button(label, *args, **kwargs):
+            # Remove kwargs not supported in this Streamlit version
+            kwargs.pop("type", None)
+            kwargs.pop("use_container_width", None)
+            return _orig_button(label, *args, **kwargs)
+
+        st.button = _patched_button
+
+    # Patch st.download_button for unsupported kwargs in older Streamlit versions
+    if hasattr(st, "download_button"):
+        if "use_container_width" not in inspect.signature(st.download_button).parameters:
+            _orig_download_button = st.download_button
+
+            def _patched_download_button(label, data, *args, **kwargs):
+                kwargs.pop("use_container_width", None)
+                return _orig_download_button(label, data, *args, **kwargs)
+
+            st.download_button = _patched_download_button
@@ -1,11 +1,86 @@
 import os
+import atexit
+import json
+import hashlib
 import mimetypes
+import subprocess
+import shutil
 import tempfile
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator
 import librosa
 import numpy as np
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# Linux ioctl that makes a file share (reflink) another file's data blocks
+FICLONE = 0x40049409
+
+@dataclass(eq=False)
+class WordTimings:
+    """Word-level timestamps stored as parallel arrays instead of a list of dicts"""
+    
+    starts: np.ndarray
+    ends: np.ndarray
+    words: List[str]
+    
+    @classmethod
+    def from_dicts(cls, word_timestamps: List[Dict]) -> 'WordTimings':
+        """
+        Build word timings from a list of word timestamp dictionaries
+        
+        Args:
+            word_timestamps: List of dictionaries with word, start, and end timestamps
+            
+        Returns:
+            WordTimings holding the same data
+        """
+        count = len(word_timestamps)
+        return cls(
+            starts=np.fromiter((w['start'] for w in word_timestamps), dtype=np.float64, count=count),
+            ends=np.fromiter((w['end'] for w in word_timestamps), dtype=np.float64, count=count),
+            words=[w['word'] for w in word_timestamps]
+        )
+    
+    def __len__(self) -> int:
+        return len(self.words)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        """Yield word dictionaries for consumers still expecting the list-of-dicts layout"""
+        for word, start, end in zip(self.words, self.starts.tolist(), self.ends.tolist()):
+            yield {'word': word, 'start': start, 'end': end}
+    
+    def __getstate__(self) -> Dict:
+        """Pickle as one packed (start, end) record buffer and a NUL-joined word blob"""
+        times = np.empty(len(self.words), dtype=_WORD_TIMES_DTYPE)
+        times['start'] = self.starts
+        times['end'] = self.ends
+        return {
+            'times': times.tobytes(),
+            'words_blob': '\x00'.join(self.words).encode('utf-8')
+        }
+    
+    def digest(self) -> str:
+        """Short content digest of the timings, for cache keys that must track them"""
+        state = self.__getstate__()
+        return hashlib.sha256(state['times'] + b'\x00' + state['words_blob']).hexdigest()[:16]
+    
+    def __setstate__(self, state: Dict):
+        times = np.frombuffer(state['times'], dtype=_WORD_TIMES_DTYPE)
+        self.starts = times['start'].copy()
+        self.ends = times['end'].copy()
+        self.words = state['words_blob'].decode('utf-8').split('\x00') if len(times) else []
+
+# Packed record layout used when pickling WordTimings
+_WORD_TIMES_DTYPE = np.dtype([('start', '<f8'), ('end', '<f8')])
+
 def format_timestamp(seconds: float) -> str:
     """
     Format seconds into MM:SS.mmm format
@@ -90,6 +165,99 @@ def get_audio_info(file_path: str) -> Dict:
             'format': 'unknown'
         }
 
+def get_audio_codec(file_path: str) -> Optional[str]:
+    """
+    Probe the codec of the first audio stream with ffprobe
+    
+    The result is cached per (path, modification time), so callers can ask
+    repeatedly without spawning ffprobe each time.
+    
+    Args:
+        file_path: Path to the audio file
+        
+    Returns:
+        Codec name (e.g., 'mp3', 'aac'), or None if it could not be probed
+    """
+    try:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
+        return None
+    return _probe_audio_codec(file_path, mtime)
+
+@lru_cache(maxsize=64)
+def _probe_audio_codec(file_path: str, mtime: float) -> Optional[str]:
+    """Run ffprobe for get_audio_codec; mtime only keys the cache"""
+    cmd = [
+        'ffprobe', '-hide_banner', '-loglevel', 'error',
+        '-select_streams', 'a:0', '-show_streams', '-of', 'json', file_path
+    ]
+    try:
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True,
+                                text=True, timeout=30, check=True)
+        streams = json.loads(result.stdout).get('streams', [])
+        return streams[0].get('codec_name') if streams else None
+    except Exception:
+        return None
+
+def clone_file(src: str, dst: str) -> None:
+    """
+    Copy a file, sharing its data blocks with the source where the filesystem allows
+    
+    On copy-on-write filesystems (Btrfs, XFS, overlayfs on either) the copy is a
+    metadata-only reflink; elsewhere it falls back to shutil.copyfile.
+    
+    Args:
+        src: Path to the source file
+        dst: Path for the copy
+    """
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            return
+        except OSError:
+            pass
+    
+    # shutil.copyfile already uses sendfile on Linux
+    shutil.copyfile(src, dst)
+
+class SharedTempDir:
+    """
+    One temp directory shared by every instance of a class, removed with the last one
+    
+    Creating these objects per request then costs a counter update instead
+    of a mkdtemp/rmtree pair. The directory is also removed at exit, since
+    __del__ may never run at interpreter shutdown.
+    """
+    
+    def __init__(self, prefix: str):
+        """
+        Args:
+            prefix: Name prefix for the directory
+        """
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._path = None
+        self._refs = 0
+    
+    def acquire(self) -> str:
+        """Take a reference to the directory, creating it if needed, and return its path"""
+        with self._lock:
+            if self._path is None or not os.path.isdir(self._path):
+                self._path = tempfile.mkdtemp(prefix=self._prefix)
+                atexit.register(shutil.rmtree, self._path, ignore_errors=True)
+            self._refs += 1
+            return self._path
+    
+    def release(self) -> None:
+        """Drop a reference; the last one removes the directory"""
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0 or self._path is None:
+                return
+            path, self._path = self._path, None
+        shutil.rmtree(path, ignore_errors=True)
+
 def clean_text(text: str) -> str:
     """
     Clean and normalize text for better processing
@@ -318,6 +486,8 @@ def merge_overlapping_timestamps(word_timestamps: List[Dict],
     
     merged_timestamps = []
     current_group = [word_timestamps[0]]
+    get_word = itemgetter('word')
+    join = ' '.join
     
     for word_data in word_timestamps[1:]:
         last_end = current_group[-1]['end']
@@ -333,7 +503,7 @@ def merge_overlapping_timestamps(word_timestamps: List[Dict],
             else:
                 # Merge multiple words
                 merged_word = {
-                    'word': ' '.join([w['word'] for w in current_group]),
+                    'word': join(map(get_word, current_group)),
                     'start': current_group[0]['start'],
                     'end': current_group[-1]['end']
                 }
@@ -346,7 +516,7 @@ def merge_overlapping_timestamps(word_timestamps: List[Dict],
         merged_timestamps.append(current_group[0])
     else:
         merged_word = {
-            'word': ' '.join([w['word'] for w in current_group]),
+            'word': join(map(get_word, current_group)),
             'start': current_group[0]['start'],
             'end': current_group[-1]['end']
         }
@@ -1,17 +1,150 @@
 import os
-import tempfile
+import uuid
 import subprocess
-import shutil
-from typing import List, Dict
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Iterator
 import textwrap
+from utils import get_audio_codec, clone_file, SharedTempDir
+
+if TYPE_CHECKING:
+    from PIL import Image  # imported lazily at runtime
+
+# Slide layout shared by the drawtext and PIL renderers
+SLIDE_WIDTH, SLIDE_HEIGHT = 1280, 720
+SLIDE_LINE_HEIGHT = 40
+SLIDE_TITLE = "SyncMaster - متزامن النص"
+
+# Rendered slides and finished videos kept for identical inputs (1280x720 PNGs are ~3 MB)
+SLIDE_CACHE_SIZE = 32
+
+# The slide is encoded once as a short clip (one keyframe, then near-empty
+# P-frames) that is looped under the audio; 10 fps keeps files small
+BASE_CLIP_FPS = 10
+BASE_CLIP_SECONDS = 10
+
+# Audio codecs an MP4 file can carry without re-encoding
+MP4_COPY_CODECS = ('aac', 'mp3')
+
+# System fonts, looked up once at import instead of on every render
+def _first_existing(*paths: str) -> Optional[str]:
+    """Return the first of the given paths that exists, or None"""
+    return next((path for path in paths if os.path.exists(path)), None)
+
+FONT_PATH = _first_existing("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                            "/System/Library/Fonts/Arial.ttf")
+BOLD_FONT_PATH = _first_existing("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+
+@lru_cache(maxsize=32)
+def _get_font(path: Optional[str], size: int):
+    """Load a TrueType font once per (path, size), or PIL's default font if unavailable"""
+    from PIL import ImageFont
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+# Probed on first use, not at import, and then remembered for the process
+@lru_cache(maxsize=None)
+def _ffmpeg_ok() -> bool:
+    """Check once whether a working ffmpeg is on PATH"""
+    try:
+        subprocess.run(['ffmpeg', '-version'], stdin=subprocess.DEVNULL,
+                       capture_output=True, check=True, timeout=10)
+        return True
+    except Exception:
+        return False
+
+@lru_cache(maxsize=None)
+def _ffmpeg_has_filter(name: str) -> bool:
+    """Check once whether the ffmpeg on PATH provides the named filter"""
+    if not _ffmpeg_ok():
+        return False
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-filters'], stdin=subprocess.DEVNULL,
+                                capture_output=True, text=True, timeout=10)
+    except Exception:
+        return False
+    return any(line.split()[1:2] == [name] for line in result.stdout.splitlines())
+
+# H.264 encoders by preference: (arguments before the inputs, codec arguments, video filter).
+# Hardware encoders leave the CPU free; libx264 is always the last resort.
+VIDEO_ENCODERS = {
+    'h264_nvenc': ([], ['-c:v', 'h264_nvenc', '-preset', 'p1'], 'scale=1280:720,format=yuv420p'),
+    'h264_videotoolbox': ([], ['-c:v', 'h264_videotoolbox'], 'scale=1280:720,format=yuv420p'),
+    'h264_vaapi': (['-vaapi_device', '/dev/dri/renderD128'], ['-c:v', 'h264_vaapi'],
+                   'scale=1280:720,format=nv12,hwupload'),
+    'h264_qsv': ([], ['-c:v', 'h264_qsv', '-preset', 'veryfast'], 'scale=1280:720,format=nv12'),
+    # A still frame costs x264 almost nothing with the stillimage tune
+    'libx264': ([], ['-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'stillimage', '-pix_fmt', 'yuv420p'],
+                'scale=1280:720'),
+}
+
+@lru_cache(maxsize=None)
+def _pick_video_encoder() -> str:
+    """Return the first hardware H.264 encoder ffmpeg was built with, or libx264"""
+    if not _ffmpeg_ok():
+        return 'libx264'
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], stdin=subprocess.DEVNULL,
+                                capture_output=True, text=True, timeout=10)
+    except Exception:
+        return 'libx264'
+    available = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+    for name in VIDEO_ENCODERS:
+        if name == 'h264_vaapi' and not os.path.exists('/dev/dri/renderD128'):
+            continue
+        if name in available:
+            return name
+    return 'libx264'
 
 class VideoGenerator:
     """Creates actual MP4 videos with synchronized text animation"""
     
-    def __init__(self):
-        """Initialize the video generator"""
-        self.temp_dir = tempfile.mkdtemp()
+    _shared_dir = SharedTempDir('syncmaster_video_')
+    
+    @classmethod
+    def _get_shared_tempdir(cls) -> str:
+        """Acquire the temp dir shared by all generators created without a work_dir"""
+        return cls._shared_dir.acquire()
+    
+    def __init__(self, work_dir: Optional[str] = None):
+        """
+        Initialize the video generator
+        
+        Args:
+            work_dir: Directory for output and scratch files, owned by the caller. If omitted,
+                a temp dir shared by all such generators is used, removed with the last of them.
+        """
+        self._owns_temp_dir = work_dir is None
+        self.temp_dir = self._get_shared_tempdir() if work_dir is None else work_dir
+        
+        # Generators sharing the dir keep their files apart with a per-instance prefix;
+        # the content-addressed slide cache under cache/ is shared as is
+        self._file_prefix = f"{uuid.uuid4().hex[:8]}_" if work_dir is None else ''
+        
+        self._title_cache = {}
+        
+        # Being listed does not guarantee a usable device, so a failing
+        # hardware encoder is dropped in favour of libx264 (see _video_options).
+        # It encodes the looped base clip, which is stream-copied into the output,
+        # and the full-encode fallback.
+        self._venc = _pick_video_encoder()
+        
+        # Slide key -> PNG path / one-frame clip path, and (slide key, audio path,
+        # audio mtime) -> (video path, video mtime); all evict least recently used first
+        self._png_cache = OrderedDict()
+        self._base_cache = OrderedDict()
+        self._output_cache = OrderedDict()
+        
+        # Sessions share one generator, so cache bookkeeping is guarded; the
+        # encodes themselves run unlocked and write to per-call scratch names
+        self._cache_lock = threading.Lock()
         
     def create_synchronized_video(self, audio_path: str, word_timestamps: List[Dict], 
                                 text: str, style_config: Dict, output_filename: str) -> str:
@@ -19,7 +152,7 @@ class VideoGenerator:
         Create a synchronized MP4 video with animated text
         """
         try:
-            output_path = os.path.join(self.temp_dir, output_filename)
+            output_path = self._scratch_path(output_filename)
             
             # Create a simple slideshow video
             return self._create_simple_slideshow(audio_path, text, style_config, output_filename)
@@ -30,135 +163,429 @@ class VideoGenerator:
     
     def _create_simple_slideshow(self, audio_path: str, text: str, style_config: Dict, output_filename: str) -> str:
         """Create a simple slideshow video"""
-        output_path = os.path.join(self.temp_dir, output_filename)
-        
-        # Create a single image with the text
-        width, height = 1280, 720
-        bg_color = self._hex_to_rgb(style_config.get('background_color', '#000000'))
-        text_color = self._hex_to_rgb(style_config.get('text_color', '#FFFFFF'))
-        
-        img = Image.new('RGB', (width, height), bg_color)
-        draw = ImageDraw.Draw(img)
+        output_path = self._scratch_path(output_filename)
         
-        # Wrap text to fit on screen
-        wrapped_text = textwrap.fill(text, width=50)
+        # Per-call files (drawtext line files) removed once the video is done
+        scratch_files = []
         
+        # Create video from single image and audio using ffmpeg
         try:
-            # Try to use a system font
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 32)
-        except:
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 32)
-            except:
-                font = ImageFont.load_default()
+            if not _ffmpeg_ok():
+                print("FFmpeg not available, using fallback")
+                return self._create_fallback_video(audio_path, text, output_filename)
+            
+            # The same slide over the same audio was encoded before: reuse that video
+            slide_key = self._slide_key(text, style_config)
+            output_key = (slide_key, audio_path, os.path.getmtime(audio_path))
+            with self._cache_lock:
+                cached = self._output_cache.get(output_key)
+                if cached:
+                    self._output_cache.move_to_end(output_key)
+            if cached and os.path.exists(cached[0]) and os.path.getmtime(cached[0]) == cached[1]:
+                if cached[0] != output_path:
+                    clone_file(cached[0], output_path)
+                return output_path
+            
+            # drawtext slides fall back to a PIL-rendered PNG, rendered only if needed
+            for still_args in self._still_inputs(text, style_config, scratch_files):
+                is_drawtext = still_args[:2] == ['-f', 'lavfi']
+                
+                # Encode the slide once as a short clip and loop it under the audio
+                # with a stream copy, so the encode no longer scales with duration
+                base_path = self._base_clip(slide_key, still_args)
+                if not base_path and is_drawtext:
+                    # The drawtext graph itself failed; a full encode would fail the same way
+                    continue
+                if base_path:
+                    for audio_args in self._audio_options(audio_path):
+                        cmd = [
+                            'ffmpeg', '-nostdin', '-y', '-loglevel', 'error',
+                            '-stream_loop', '-1', '-i', base_path,
+                            '-i', audio_path,
+                            *self._loop_output_args(0, audio_args, output_path)
+                        ]
+                        if self._run_ffmpeg(cmd, output_path):
+                            return self._remember_output(output_key, output_path)
+                
+                # Otherwise encode the still input for the whole duration
+                for venc in self._video_options():
+                    for audio_args in self._audio_options(audio_path):
+                        cmd = [
+                            'ffmpeg', '-nostdin', '-y', '-loglevel', 'error',
+                            *VIDEO_ENCODERS[venc][0],
+                            *still_args,
+                            '-i', audio_path,
+                            *self._output_args(audio_args, output_path, venc)
+                        ]
+                        if self._run_ffmpeg(cmd, output_path):
+                            return self._remember_output(output_key, output_path)
+                    
+                    # A failing drawtext input says nothing about the encoder
+                    if venc != 'libx264' and not is_drawtext:
+                        print(f"{venc} failed, falling back to libx264")
+                        self._venc = 'libx264'
+            
+            # Try fallback method
+            return self._create_fallback_video(audio_path, text, output_filename)
+                
+        except Exception as e:
+            print(f"Video creation error: {e}")
+            # If ffmpeg fails, try a simpler approach
+            return self._create_fallback_video(audio_path, text, output_filename)
         
-        # Calculate text position for centering
-        lines = wrapped_text.split('\n')
-        line_height = 40
-        total_height = len(lines) * line_height
-        start_y = (height - total_height) // 2
+        finally:
+            self._remove_files(scratch_files)
+    
+    def batch_create(self, jobs: List[Dict]) -> List[str]:
+        """
+        Create several slideshow videos with a single ffmpeg process
         
-        # Draw each line of text
-        for i, line in enumerate(lines):
-            if line.strip():  # Only draw non-empty lines
-                bbox = draw.textbbox((0, 0), line, font=font)
-                text_width = bbox[2] - bbox[0]
-                x = (width - text_width) // 2
-                y = start_y + i * line_height
-                draw.text((x, y), line, fill=text_color, font=font)
+        Every job adds its slide and audio as inputs and its own mapped output,
+        so N videos pay for one ffmpeg startup instead of N. If the batch fails,
+        each job is retried on its own.
+        
+        Args:
+            jobs: List of dictionaries with the create_synchronized_video arguments
+                (audio_path, word_timestamps, text, style_config, output_filename)
+            
+        Returns:
+            List of output paths, in job order
+        """
+        if not _ffmpeg_ok() or len(jobs) < 2:
+            return [self.create_synchronized_video(**job) for job in jobs]
         
-        # Add title
-        title = "SyncMaster - متزامن النص"
         try:
-            title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 48)
-        except:
-            title_font = font
+            cmd = ['ffmpeg', '-nostdin', '-y', '-loglevel', 'error']
+            for job in jobs:
+                img_path = self._render_slide_png(job['text'], job['style_config'])
+                base_path = self._base_clip(self._slide_key(job['text'], job['style_config']),
+                                            ['-loop', '1', '-i', img_path])
+                if not base_path:
+                    raise RuntimeError("could not encode the slide clip")
+                cmd += ['-stream_loop', '-1', '-i', base_path, '-i', job['audio_path']]
+            
+            output_paths = []
+            for index, job in enumerate(jobs):
+                output_path = self._scratch_path(job['output_filename'])
+                audio_args = self._audio_options(job['audio_path'])[0]
+                cmd += self._loop_output_args(2 * index, audio_args, output_path)
+                output_paths.append(output_path)
+            
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60 * len(jobs))
+            if result.returncode == 0 and all(os.path.exists(path) and os.path.getsize(path) > 0
+                                              for path in output_paths):
+                return output_paths
+            print(f"Batch FFmpeg error: {result.stderr}")
+        except Exception as e:
+            print(f"Batch video creation error: {e}")
         
-        bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = bbox[2] - bbox[0]
-        title_x = (width - title_width) // 2
-        draw.text((title_x, 50), title, fill=self._hex_to_rgb('#FFD700'), font=title_font)
+        return [self.create_synchronized_video(**job) for job in jobs]
+    
+    def create_many(self, jobs: List[Dict], max_workers: Optional[int] = None) -> List[str]:
+        """
+        Create videos for several independent jobs in parallel worker processes
         
-        # Save image
-        img_path = os.path.join(self.temp_dir, 'slideshow.png')
-        img.save(img_path)
+        The jobs are split across the workers and each worker runs its share
+        through batch_create, so a worker also pays only one ffmpeg startup.
         
-        # Create video from single image and audio using ffmpeg
+        Args:
+            jobs: List of dictionaries with the create_synchronized_video arguments
+            max_workers: Number of worker processes (defaults to the CPU count)
+            
+        Returns:
+            List of output paths, in job order
+        """
+        workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        if workers < 2:
+            return self.batch_create(jobs)
+        
+        # Worker i takes jobs i, i + workers, ... into its own scratch dir below temp_dir
+        chunks = [(self._scratch_path(f'worker_{i}'), jobs[i::workers]) for i in range(workers)]
         try:
-            # First check if ffmpeg is available
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk_results = list(executor.map(_create_chunk, chunks))
+        except Exception as e:
+            print(f"Parallel video creation failed: {e}, creating videos in this process")
+            return self.batch_create(jobs)
+        
+        results = [None] * len(jobs)
+        for i, paths in enumerate(chunk_results):
+            results[i::workers] = paths
+        return results
+    
+    def _audio_options(self, audio_path: str) -> List[List[str]]:
+        """Audio codec arguments to try in order: stream copy when the MP4 can hold it, then AAC"""
+        audio_options = [['-c:a', 'aac', '-b:a', '128k']]
+        if get_audio_codec(audio_path) in MP4_COPY_CODECS:
+            audio_options.insert(0, ['-c:a', 'copy'])
+        return audio_options
+    
+    def _run_ffmpeg(self, cmd: List[str], output_path: str) -> bool:
+        """Run one ffmpeg command and report whether it produced a non-empty output"""
+        print(f"Running FFmpeg command: {' '.join(cmd)}")
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        
+        if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            print(f"Video created successfully: {output_path}")
+            return True
+        print(f"FFmpeg error: {result.stderr}")
+        print(f"FFmpeg stdout: {result.stdout}")
+        return False
+    
+    def _remember_output(self, output_key: tuple, output_path: str) -> str:
+        """Record a finished video in the output cache and return its path"""
+        with self._cache_lock:
+            self._output_cache[output_key] = (output_path, os.path.getmtime(output_path))
+            if len(self._output_cache) > SLIDE_CACHE_SIZE:
+                self._output_cache.popitem(last=False)
+        return output_path
+    
+    def _cached_file(self, cache: OrderedDict, key: str) -> Optional[str]:
+        """Look up a generated file in a bounded cache, marking it recently used"""
+        with self._cache_lock:
+            path = cache.get(key)
+            if path and os.path.exists(path):
+                cache.move_to_end(key)
+                return path
+        return None
+    
+    def _cache_file(self, cache: OrderedDict, key: str, tmp_path: str, path: str) -> None:
+        """Move a freshly written file into place and add it to a bounded cache, evicting the oldest file"""
+        # The file was written under a per-call name; the rename is atomic, so
+        # concurrent renders of the same slide never see each other's partial writes
+        os.replace(tmp_path, path)
+        with self._cache_lock:
+            cache[key] = path
+            cache.move_to_end(key)
+            evicted_path = cache.popitem(last=False)[1] if len(cache) > SLIDE_CACHE_SIZE else None
+        self._remove_files([evicted_path] if evicted_path else [])
+    
+    def _remove_files(self, paths: List[str]) -> None:
+        """Delete scratch files, ignoring ones already gone"""
+        for path in paths:
             try:
-                subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True, timeout=10)
-            except:
-                print("FFmpeg not available, using fallback")
-                return self._create_fallback_video(audio_path, text, output_filename)
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _base_clip(self, slide_key: str, still_args: List[str]) -> Optional[str]:
+        """
+        Encode the slide as a short H.264 clip, cached next to the slide PNG
+        
+        The clip is one GOP of BASE_CLIP_SECONDS: a single keyframe followed by
+        P-frames that cost next to nothing for a still image, so the looped output
+        carries one keyframe per BASE_CLIP_SECONDS rather than one per frame. The
+        detected encoder is tried first, then libx264; the encoder is dropped only
+        if libx264 then succeeds on the same input, so a bad input never blames it.
+        
+        Args:
+            slide_key: Key of the slide from _slide_key
+            still_args: ffmpeg input arguments producing the slide
             
+        Returns:
+            Path to the clip, or None if it could not be encoded
+        """
+        base_path = self._cached_file(self._base_cache, slide_key)
+        if base_path:
+            return base_path
+        
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        base_path = os.path.join(cache_dir, f'{slide_key}.mp4')
+        tmp_path = os.path.join(cache_dir, f'{slide_key}_{uuid.uuid4().hex[:8]}.mp4')
+        failed = []
+        for venc in self._video_options():
+            pre_input_args, codec_args, video_filter = VIDEO_ENCODERS[venc]
             cmd = [
-                'ffmpeg', '-y', '-loglevel', 'error',
-                '-loop', '1', '-i', img_path,
-                '-i', audio_path,
-                '-c:v', 'libx264', '-preset', 'ultrafast',
-                '-c:a', 'aac', '-b:a', '128k',
-                '-pix_fmt', 'yuv420p',
-                '-vf', 'scale=1280:720',
-                '-r', '10',  # 10 fps for smaller file size
-                '-shortest',
-                '-t', '30',  # Limit to 30 seconds for faster processing
-                output_path
+                'ffmpeg', '-nostdin', '-y', '-loglevel', 'error',
+                *pre_input_args,
+                *still_args,
+                *codec_args,
+                '-vf', video_filter,
+                '-r', str(BASE_CLIP_FPS),
+                '-t', str(BASE_CLIP_SECONDS),
+                '-g', str(BASE_CLIP_FPS * BASE_CLIP_SECONDS),
+                tmp_path
             ]
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                error = result.stderr if result.returncode != 0 or not os.path.exists(tmp_path) else None
+            except Exception as e:
+                error = str(e)
+            if error is None:
+                if failed:
+                    print(f"{failed[0]} failed, falling back to libx264")
+                    self._venc = 'libx264'
+                self._cache_file(self._base_cache, slide_key, tmp_path, base_path)
+                return base_path
             
-            print(f"Running FFmpeg command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            
-            if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                print(f"Video created successfully: {output_path}")
-                return output_path
-            else:
-                print(f"FFmpeg error: {result.stderr}")
-                print(f"FFmpeg stdout: {result.stdout}")
-                # Try fallback method
-                return self._create_fallback_video(audio_path, text, output_filename)
-                
-        except Exception as e:
-            print(f"Video creation error: {e}")
-            # If ffmpeg fails, try a simpler approach
-            return self._create_fallback_video(audio_path, text, output_filename)
+            print(f"Slide clip error ({venc}): {error}")
+            self._remove_files([tmp_path])
+            failed.append(venc)
+        
+        return None
+    
+    def _loop_output_args(self, video_index: int, audio_args: List[str], output_path: str) -> List[str]:
+        """Output arguments muxing a looped slide clip (input video_index) with the following audio input"""
+        return [
+            '-map', f'{video_index}:v', '-map', f'{video_index + 1}:a',
+            '-c:v', 'copy',
+            *audio_args,
+            '-shortest',
+            '-t', '30',  # Limit to 30 seconds for faster processing
+            output_path
+        ]
+    
+    def _video_options(self) -> List[str]:
+        """Video encoders to try in order: the detected hardware encoder, then libx264"""
+        return [self._venc, 'libx264'] if self._venc != 'libx264' else ['libx264']
+    
+    def _output_args(self, audio_args: List[str], output_path: str, venc: str = 'libx264') -> List[str]:
+        """Encoding arguments for one slideshow output"""
+        _, codec_args, video_filter = VIDEO_ENCODERS[venc]
+        return [
+            *codec_args,
+            *audio_args,
+            '-vf', video_filter,
+            '-r', '10',  # 10 fps for smaller file size
+            '-shortest',
+            '-t', '30',  # Limit to 30 seconds for faster processing
+            output_path
+        ]
+    
+    def _slide_lines(self, text: str) -> List[Tuple[str, int]]:
+        """Wrap the text for the slide and place each non-empty line vertically"""
+        # Wrap text to fit on screen
+        lines = textwrap.fill(text, width=50).split('\n')
+        
+        # Calculate text position for centering
+        total_height = len(lines) * SLIDE_LINE_HEIGHT
+        start_y = (SLIDE_HEIGHT - total_height) // 2
+        return [(line, start_y + i * SLIDE_LINE_HEIGHT) for i, line in enumerate(lines) if line.strip()]
+    
+    def _still_inputs(self, text: str, style_config: Dict, scratch_files: List[str]) -> Iterator[List[str]]:
+        """
+        Yield ffmpeg input arguments for the slide, cheapest first
+        
+        With the drawtext filter the slide is drawn by ffmpeg itself from a lavfi
+        color source; otherwise (or if that fails) it is rendered with PIL into a
+        PNG that is looped as the video input. Files the inputs read that the
+        caller must remove afterwards are appended to scratch_files.
+        """
+        if FONT_PATH and _ffmpeg_has_filter('drawtext'):
+            yield ['-f', 'lavfi', '-i', self._drawtext_graph(text, style_config, scratch_files)]
+        yield ['-loop', '1', '-i', self._render_slide_png(text, style_config)]
+    
+    def _drawtext_graph(self, text: str, style_config: Dict, scratch_files: List[str]) -> str:
+        """
+        Build a lavfi graph that draws the slide
+        
+        Text goes through files so it needs no filter-graph escaping, and
+        expansion=none keeps drawtext from interpreting '%' and '\\' in it.
+        """
+        bg_color = self._hex_to_rgb(style_config.get('background_color', '#000000'))
+        text_color = self._hex_to_rgb(style_config.get('text_color', '#FFFFFF'))
+        
+        # Line files are unique per call, so concurrent videos never read each other's text
+        token = uuid.uuid4().hex[:8]
+        
+        def drawtext(line: str, index: int, font_path: str, size: int, color: tuple, y: int) -> str:
+            text_path = self._scratch_path(f'slide_{token}_line_{index}.txt')
+            scratch_files.append(text_path)
+            with open(text_path, 'w', encoding='utf-8') as f:
+                f.write(line)
+            return (f"drawtext=fontfile='{font_path}':textfile='{text_path}':fontsize={size}"
+                    f":fontcolor=0x{bytes(color).hex()}:x=(w-text_w)/2:y={y}:expansion=none")
+        
+        filters = [f"color=c=0x{bytes(bg_color).hex()}:s={SLIDE_WIDTH}x{SLIDE_HEIGHT}:r=10"]
+        filters += [drawtext(line, i, FONT_PATH, 32, text_color, y)
+                    for i, (line, y) in enumerate(self._slide_lines(text))]
+        
+        # Add title
+        filters.append(drawtext(SLIDE_TITLE, len(filters), BOLD_FONT_PATH or FONT_PATH, 48,
+                                self._hex_to_rgb('#FFD700'), 50))
+        return ','.join(filters)
+    
+    def _scratch_path(self, name: str) -> str:
+        """Path for one of this generator's own files in the (possibly shared) temp dir"""
+        return os.path.join(self.temp_dir, self._file_prefix + name)
+    
+    def _slide_key(self, text: str, style_config: Dict) -> str:
+        """Hash the inputs that determine what the slide looks like"""
+        return hashlib.blake2b(text.encode('utf-8') + repr(sorted(style_config.items())).encode('utf-8'),
+                               digest_size=16).hexdigest()
+    
+    def _render_slide_png(self, text: str, style_config: Dict) -> str:
+        """Render the slide with PIL and return the path of the saved PNG, reusing cached slides"""
+        key = self._slide_key(text, style_config)
+        img_path = self._cached_file(self._png_cache, key)
+        if img_path:
+            return img_path
+        
+        from PIL import Image, ImageDraw
+        
+        # Create a single image with the text
+        bg_color = self._hex_to_rgb(style_config.get('background_color', '#000000'))
+        text_color = self._hex_to_rgb(style_config.get('text_color', '#FFFFFF'))
+        
+        img = Image.new('RGB', (SLIDE_WIDTH, SLIDE_HEIGHT), bg_color)
+        draw = ImageDraw.Draw(img)
+        
+        font = _get_font(FONT_PATH, 32)
+        
+        # Draw each line of text
+        for line, y in self._slide_lines(text):
+            text_width = int(font.getlength(line))
+            x = (SLIDE_WIDTH - text_width) // 2
+            draw.text((x, y), line, fill=text_color, font=font)
+        
+        # Add title
+        title_font = _get_font(BOLD_FONT_PATH, 48) if BOLD_FONT_PATH else font
+        
+        title_sprite = self._title_sprite(SLIDE_TITLE, self._hex_to_rgb('#FFD700'), title_font)
+        title_x = (SLIDE_WIDTH - title_sprite.width) // 2
+        img.paste(title_sprite, (title_x, 50), title_sprite)
+        
+        # Save image
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        img_path = os.path.join(cache_dir, f'{key}.png')
+        tmp_path = os.path.join(cache_dir, f'{key}_{uuid.uuid4().hex[:8]}.png')
+        img.save(tmp_path)
+        
+        self._cache_file(self._png_cache, key, tmp_path, img_path)
+        return img_path
     
     def _create_fallback_video(self, audio_path: str, text: str, output_filename: str) -> str:
         """Create a basic video file as fallback"""
-        output_path = os.path.join(self.temp_dir, output_filename)
+        output_path = self._scratch_path(output_filename)
         
         try:
+            from PIL import Image, ImageDraw
+            
             # First try to create a simple image slideshow
             width, height = 1280, 720
             img = Image.new('RGB', (width, height), (0, 0, 0))  # Black background
             draw = ImageDraw.Draw(img)
             
             # Add simple text
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 48)
-            except:
-                font = ImageFont.load_default()
+            font = _get_font(FONT_PATH, 48)
             
             # Draw title
             title = "SyncMaster Video"
-            bbox = draw.textbbox((0, 0), title, font=font)
-            title_width = bbox[2] - bbox[0]
+            title_width = int(font.getlength(title))
             title_x = (width - title_width) // 2
             draw.text((title_x, height//2 - 50), title, fill=(255, 255, 255), font=font)
             
             # Draw subtitle
             subtitle = "Synchronized Audio & Text"
-            try:
-                sub_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 32)
-            except:
-                sub_font = font
-            bbox = draw.textbbox((0, 0), subtitle, font=sub_font)
-            sub_width = bbox[2] - bbox[0]
+            sub_font = _get_font(FONT_PATH, 32) if FONT_PATH else font
+            sub_width = int(sub_font.getlength(subtitle))
             sub_x = (width - sub_width) // 2
             draw.text((sub_x, height//2 + 20), subtitle, fill=(255, 215, 0), font=sub_font)
             
-            # Save fallback image
-            fallback_img_path = os.path.join(self.temp_dir, 'fallback.png')
+            # Save fallback image under a per-call name; it is only an ffmpeg input
+            fallback_img_path = self._scratch_path(f'fallback_{uuid.uuid4().hex[:8]}.png')
             img.save(fallback_img_path)
             
             # Try to create video with simpler ffmpeg command
@@ -175,7 +602,10 @@ class VideoGenerator:
                 output_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            finally:
+                self._remove_files([fallback_img_path])
             
             if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
                 print(f"Fallback video created: {output_path}")
@@ -183,8 +613,8 @@ class VideoGenerator:
             else:
                 print(f"Fallback FFmpeg also failed: {result.stderr}")
                 # Final fallback - copy audio as M4A with proper extension
-                fallback_path = os.path.join(self.temp_dir, output_filename.replace('.mp4', '.m4a'))
-                shutil.copy2(audio_path, fallback_path)
+                fallback_path = self._scratch_path(output_filename.replace('.mp4', '.m4a'))
+                clone_file(audio_path, fallback_path)
                 print(f"Created audio fallback: {fallback_path}")
                 return fallback_path
                 
@@ -192,34 +622,55 @@ class VideoGenerator:
             print(f"Fallback video creation error: {e}")
             # Final fallback - copy the audio file
             try:
-                fallback_path = os.path.join(self.temp_dir, output_filename.replace('.mp4', '.m4a'))
-                shutil.copy2(audio_path, fallback_path)
+                fallback_path = self._scratch_path(output_filename.replace('.mp4', '.m4a'))
+                clone_file(audio_path, fallback_path)
                 print(f"Final fallback audio: {fallback_path}")
                 return fallback_path
             except Exception as copy_error:
                 print(f"Even audio copy failed: {copy_error}")
                 # Create a basic MP3 copy as final fallback
                 try:
-                    mp3_fallback = os.path.join(self.temp_dir, output_filename.replace('.mp4', '.mp3'))
-                    shutil.copy2(audio_path, mp3_fallback)
+                    mp3_fallback = self._scratch_path(output_filename.replace('.mp4', '.mp3'))
+                    clone_file(audio_path, mp3_fallback)
                     return mp3_fallback
                 except:
                     return audio_path  # Return original audio path as last resort
     
-    def _hex_to_rgb(self, hex_color: str) -> tuple:
-        """Convert hex color to RGB tuple"""
+    def _title_sprite(self, title: str, color: tuple, font) -> 'Image.Image':
+        """Render the title once into a transparent sprite, reused by later videos"""
+        key = (title, color, font)
+        if key not in self._title_cache:
+            from PIL import Image, ImageDraw
+            _, _, right, bottom = font.getbbox(title)
+            sprite = Image.new('RGBA', (right, bottom), (0, 0, 0, 0))
+            ImageDraw.Draw(sprite).text((0, 0), title, fill=color, font=font)
+            self._title_cache[key] = sprite
+        return self._title_cache[key]
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _hex_to_rgb(hex_color: str) -> tuple:
+        """Convert hex color to RGB tuple (only a handful of colors ever appear, so results are cached)"""
         hex_color = hex_color.lstrip('#')
         if len(hex_color) != 6:
             return (255, 255, 255)  # Default to white
         try:
-            return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        except:
+            return tuple(bytes.fromhex(hex_color))
+        except ValueError:
             return (255, 255, 255)  # Default to white
     
     def __del__(self):
         """Clean up temporary files"""
+        if not getattr(self, '_owns_temp_dir', False):
+            return
         try:
-            if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir, ignore_errors=True)
+            if hasattr(self, 'temp_dir'):
+                self._shared_dir.release()
         except:
-            pass
\ No newline at end of file
+            pass
+
+def _create_chunk(chunk: Tuple[str, List[Dict]]) -> List[str]:
+    """Create one worker's share of VideoGenerator.create_many jobs (runs in a worker process)"""
+    work_dir, jobs = chunk
+    os.makedirs(work_dir, exist_ok=True)
+    return VideoGenerator(work_dir=work_dir).batch_create(jobs)
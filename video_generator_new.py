@@ -1,9 +1,51 @@
 import os
 import tempfile
 import subprocess
-from typing import List, Dict
-from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Iterator
 import textwrap
+from utils import get_audio_codec, clone_file
+
+if TYPE_CHECKING:
+    from PIL import Image  # imported lazily at runtime
+
+# Slide layout shared by the drawtext and PIL renderers
+SLIDE_WIDTH, SLIDE_HEIGHT = 1280, 720
+SLIDE_LINE_HEIGHT = 40
+SLIDE_TITLE = "SyncMaster - متزامن النص"
+
+# Audio codecs an MP4 file can carry without re-encoding
+MP4_COPY_CODECS = ('aac', 'mp3')
+
+# System fonts, looked up once at import instead of on every render
+def _first_existing(*paths: str) -> Optional[str]:
+    """Return the first of the given paths that exists, or None"""
+    return next((path for path in paths if os.path.exists(path)), None)
+
+FONT_PATH = _first_existing("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                            "/System/Library/Fonts/Arial.ttf")
+BOLD_FONT_PATH = _first_existing("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+
+@lru_cache(maxsize=32)
+def _get_font(path: Optional[str], size: int):
+    """Load a TrueType font once per (path, size), or PIL's default font if unavailable"""
+    from PIL import ImageFont
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+@lru_cache(maxsize=None)
+def _ffmpeg_has_filter(name: str) -> bool:
+    """Check once whether the ffmpeg on PATH provides the named filter"""
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-filters'], stdin=subprocess.DEVNULL,
+                                capture_output=True, text=True, timeout=10)
+    except Exception:
+        return False
+    return any(line.split()[1:2] == [name] for line in result.stdout.splitlines())
 
 class VideoGenerator:
     """Creates actual MP4 videos with synchronized text animation"""
@@ -13,6 +55,8 @@ class VideoGenerator:
         self.temp_dir = tempfile.mkdtemp()
         self.frame_rate = 10  # Lower frame rate for faster processing
         
+        self._title_cache = {}
+        
     def create_synchronized_video(self, audio_path: str, word_timestamps: List[Dict], 
                                 text: str, style_config: Dict, output_filename: str) -> str:
         """
@@ -42,80 +86,118 @@ class VideoGenerator:
         """Create a simple slideshow video"""
         output_path = os.path.join(self.temp_dir, output_filename)
         
-        # Create a single image with the text
-        width, height = 1280, 720
+        # Create video from single image and audio using ffmpeg
+        try:
+            # A still frame costs x264 almost nothing with the stillimage tune;
+            # audio the MP4 container can hold is stream-copied, AAC otherwise
+            audio_options = [['-c:a', 'aac']]
+            if get_audio_codec(audio_path) in MP4_COPY_CODECS:
+                audio_options.insert(0, ['-c:a', 'copy'])
+            
+            # drawtext slides fall back to a PIL-rendered PNG, rendered only if needed
+            for still_args in self._still_inputs(text, style_config):
+                for audio_args in audio_options:
+                    cmd = [
+                        'ffmpeg', '-y', '-v', 'quiet',
+                        *still_args,
+                        '-i', audio_path,
+                        '-c:v', 'libx264', '-tune', 'stillimage',
+                        *audio_args,
+                        '-pix_fmt', 'yuv420p',
+                        '-shortest',
+                        '-t', '60',  # Limit to 60 seconds max
+                        output_path
+                    ]
+                    
+                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+                    
+                    if result.returncode == 0 and os.path.exists(output_path):
+                        return output_path
+            
+            raise Exception(f"FFmpeg failed: {result.stderr}")
+                
+        except Exception as e:
+            # If ffmpeg fails, try a simpler approach
+            return self._create_fallback_video(audio_path, text, output_filename)
+    
+    def _slide_lines(self, text: str) -> List[Tuple[str, int]]:
+        """Wrap the text for the slide and place each non-empty line vertically"""
+        # Wrap text to fit on screen
+        lines = textwrap.fill(text, width=50).split('\n')
+        
+        # Calculate text position for centering
+        total_height = len(lines) * SLIDE_LINE_HEIGHT
+        start_y = (SLIDE_HEIGHT - total_height) // 2
+        return [(line, start_y + i * SLIDE_LINE_HEIGHT) for i, line in enumerate(lines) if line.strip()]
+    
+    def _still_inputs(self, text: str, style_config: Dict) -> Iterator[List[str]]:
+        """
+        Yield ffmpeg input arguments for the slide, cheapest first
+        
+        With the drawtext filter the slide is drawn by ffmpeg itself from a lavfi
+        color source; otherwise (or if that fails) it is rendered with PIL into a
+        PNG that is looped as the video input.
+        """
+        if FONT_PATH and _ffmpeg_has_filter('drawtext'):
+            yield ['-f', 'lavfi', '-i', self._drawtext_graph(text, style_config)]
+        yield ['-loop', '1', '-i', self._render_slide_png(text, style_config)]
+    
+    def _drawtext_graph(self, text: str, style_config: Dict) -> str:
+        """
+        Build a lavfi graph that draws the slide
+        
+        Text goes through files so it needs no filter-graph escaping, and
+        expansion=none keeps drawtext from interpreting '%' and '\\' in it.
+        """
         bg_color = self._hex_to_rgb(style_config.get('background_color', '#000000'))
         text_color = self._hex_to_rgb(style_config.get('text_color', '#FFFFFF'))
         
-        img = Image.new('RGB', (width, height), bg_color)
-        draw = ImageDraw.Draw(img)
+        def drawtext(line: str, index: int, font_path: str, size: int, color: tuple, y: int) -> str:
+            text_path = os.path.join(self.temp_dir, f'slide_line_{index}.txt')
+            with open(text_path, 'w', encoding='utf-8') as f:
+                f.write(line)
+            return (f"drawtext=fontfile='{font_path}':textfile='{text_path}':fontsize={size}"
+                    f":fontcolor=0x{bytes(color).hex()}:x=(w-text_w)/2:y={y}:expansion=none")
         
-        # Wrap text to fit on screen
-        wrapped_text = textwrap.fill(text, width=50)
+        filters = [f"color=c=0x{bytes(bg_color).hex()}:s={SLIDE_WIDTH}x{SLIDE_HEIGHT}:r=10"]
+        filters += [drawtext(line, i, FONT_PATH, 32, text_color, y)
+                    for i, (line, y) in enumerate(self._slide_lines(text))]
         
-        try:
-            # Try to use a system font
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 32)
-        except:
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 32)
-            except:
-                font = ImageFont.load_default()
+        # Add title
+        filters.append(drawtext(SLIDE_TITLE, len(filters), BOLD_FONT_PATH or FONT_PATH, 48,
+                                self._hex_to_rgb('#FFD700'), 50))
+        return ','.join(filters)
+    
+    def _render_slide_png(self, text: str, style_config: Dict) -> str:
+        """Render the slide with PIL and return the path of the saved PNG"""
+        from PIL import Image, ImageDraw
         
-        # Calculate text position for centering
-        lines = wrapped_text.split('\n')
-        line_height = 40
-        total_height = len(lines) * line_height
-        start_y = (height - total_height) // 2
+        # Create a single image with the text
+        bg_color = self._hex_to_rgb(style_config.get('background_color', '#000000'))
+        text_color = self._hex_to_rgb(style_config.get('text_color', '#FFFFFF'))
+        
+        img = Image.new('RGB', (SLIDE_WIDTH, SLIDE_HEIGHT), bg_color)
+        draw = ImageDraw.Draw(img)
+        
+        font = _get_font(FONT_PATH, 32)
         
         # Draw each line of text
-        for i, line in enumerate(lines):
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            x = (width - text_width) // 2
-            y = start_y + i * line_height
+        for line, y in self._slide_lines(text):
+            text_width = int(font.getlength(line))
+            x = (SLIDE_WIDTH - text_width) // 2
             draw.text((x, y), line, fill=text_color, font=font)
         
         # Add title
-        title = "SyncMaster - متزامن النص"
-        try:
-            title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 48)
-        except:
-            title_font = font
+        title_font = _get_font(BOLD_FONT_PATH, 48) if BOLD_FONT_PATH else font
         
-        bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = bbox[2] - bbox[0]
-        title_x = (width - title_width) // 2
-        draw.text((title_x, 50), title, fill=self._hex_to_rgb('#FFD700'), font=title_font)
+        title_sprite = self._title_sprite(SLIDE_TITLE, self._hex_to_rgb('#FFD700'), title_font)
+        title_x = (SLIDE_WIDTH - title_sprite.width) // 2
+        img.paste(title_sprite, (title_x, 50), title_sprite)
         
         # Save image
         img_path = os.path.join(self.temp_dir, 'slideshow.png')
         img.save(img_path)
-        
-        # Create video from single image and audio using ffmpeg
-        try:
-            cmd = [
-                'ffmpeg', '-y', '-v', 'quiet',
-                '-loop', '1', '-i', img_path,
-                '-i', audio_path,
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-pix_fmt', 'yuv420p',
-                '-shortest',
-                '-t', '60',  # Limit to 60 seconds max
-                output_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            
-            if result.returncode == 0 and os.path.exists(output_path):
-                return output_path
-            else:
-                raise Exception(f"FFmpeg failed: {result.stderr}")
-                
-        except Exception as e:
-            # If ffmpeg fails, try a simpler approach
-            return self._create_fallback_video(audio_path, text, output_filename)
+        return img_path
     
     def _create_fallback_video(self, audio_path: str, text: str, output_filename: str) -> str:
         """Create a basic video file as fallback"""
@@ -140,25 +222,36 @@ class VideoGenerator:
             else:
                 # Final fallback - copy the audio file as MP4
                 fallback_path = output_path.replace('.mp4', '.m4a')
-                import shutil
-                shutil.copy2(audio_path, fallback_path)
+                clone_file(audio_path, fallback_path)
                 return fallback_path
                 
         except Exception as e:
             # Final fallback - copy the audio file
             fallback_path = output_path.replace('.mp4', '.m4a')
-            import shutil
-            shutil.copy2(audio_path, fallback_path)
+            clone_file(audio_path, fallback_path)
             return fallback_path
     
-    def _hex_to_rgb(self, hex_color: str) -> tuple:
-        """Convert hex color to RGB tuple"""
+    def _title_sprite(self, title: str, color: tuple, font) -> 'Image.Image':
+        """Render the title once into a transparent sprite, reused by later videos"""
+        key = (title, color, font)
+        if key not in self._title_cache:
+            from PIL import Image, ImageDraw
+            _, _, right, bottom = font.getbbox(title)
+            sprite = Image.new('RGBA', (right, bottom), (0, 0, 0, 0))
+            ImageDraw.Draw(sprite).text((0, 0), title, fill=color, font=font)
+            self._title_cache[key] = sprite
+        return self._title_cache[key]
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _hex_to_rgb(hex_color: str) -> tuple:
+        """Convert hex color to RGB tuple (only a handful of colors ever appear, so results are cached)"""
         hex_color = hex_color.lstrip('#')
         if len(hex_color) != 6:
             return (255, 255, 255)  # Default to white
         try:
-            return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        except:
+            return tuple(bytes.fromhex(hex_color))
+        except ValueError:
             return (255, 255, 255)  # Default to white
     
     def __del__(self):